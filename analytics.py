@@ -0,0 +1,1198 @@
+import argparse
+import atexit
+import hashlib
+import json
+import math
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are not coordinated with compaction
+    fcntl = None
+
+# Compact the event log into the snapshot after this many appended events
+COMPACT_EVERY = 500
+
+# Seconds after which a leftover compaction lock is treated as abandoned
+LOCK_TIMEOUT = 60
+
+# SQLite database used by the default backend (ANALYTICS_DB overrides, e.g. a persistent disk)
+ANALYTICS_DB = os.environ.get("ANALYTICS_DB", "analytics.db")
+
+# Seconds a writer waits for a locked database before giving up
+BUSY_TIMEOUT = 10
+
+# Number of searches kept in the search history
+SEARCH_HISTORY_LIMIT = 100
+
+# Buffered events that force a flush before FLUSH_INTERVAL is up
+FLUSH_SIZE = 200
+
+# Seconds between background flushes
+FLUSH_INTERVAL = 5.0
+
+# Maximum queued events; beyond this events are dropped rather than block a session
+QUEUE_SIZE = 10000
+
+# Recent searches kept in memory per search type for the recent-search feed
+RECENT_SEARCHES_PER_TYPE = 20
+
+# Days hourly buckets are kept before being rolled up into daily buckets
+HOURLY_RETENTION_DAYS = 7
+
+# Days daily buckets are kept before being deleted
+DAILY_RETENTION_DAYS = 365
+
+# Seconds between downsampling passes
+DOWNSAMPLE_INTERVAL = 3600
+
+# Bucket widget under which page views are counted (widget names are never empty)
+PAGEVIEW_BUCKET = ""
+
+# Counters kept per Space-Saving top-K sketch of searched values
+TOPK_CAPACITY = 100
+
+# HyperLogLog precision: 2**12 one-byte registers, about 1.6% standard error
+HLL_PRECISION = 12
+
+# Weeks of per-week sketches kept
+SKETCH_RETENTION_WEEKS = 12
+
+# Dashboard aggregates maintained as widget events are written:
+# widget -> (category, value), where a value of None means the widget's own value.
+# Occupation and industry popularity comes from the search sketches instead.
+WIDGET_AGGREGATES = {
+    "Select Wage Type": ("wage_type", None),
+    "Download Data as CSV": ("download", "CSV Data"),
+    "Download Chart as PNG": ("download", "PNG Chart"),
+    "Enable Comparison Mode": ("feature", "Comparison Mode"),
+}
+
+# Widget values that are placeholders rather than selections
+PLACEHOLDER_VALUES = {"", "-- Select an occupation --"}
+
+# Widgets recorded before occupation and industry moved to the sketches
+LEGACY_WIDGETS = ["Choose an occupation", "Choose up to 3 occupations", "Select Industry"]
+
+def week_key(when=None):
+    """ISO week of a datetime (default now), e.g. '2026-W07'."""
+    year, week, _ = (when or datetime.now()).isocalendar()
+    return f"{year}-W{week:02d}"
+
+class SpaceSaving:
+    """Space-Saving top-K summary (Metwally et al.) in at most `capacity` counters.
+    
+    Any value whose true count exceeds total/capacity is guaranteed to be
+    tracked. A tracked count overestimates the true one by at most the
+    value's `errors` entry, the count of the counter it replaced.
+    """
+    
+    def __init__(self, capacity=TOPK_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+    
+    def add(self, item, count=1):
+        if item in self.counts:
+            self.counts[item] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = count
+            self.errors[item] = 0
+        else:
+            # Replace the smallest counter; the newcomer inherits its count as error
+            victim = min(self.counts, key=self.counts.get)
+            floor = self.counts.pop(victim)
+            del self.errors[victim]
+            self.counts[item] = floor + count
+            self.errors[item] = floor
+    
+    def top(self, limit):
+        """The limit largest (item, estimated count) pairs."""
+        return sorted(self.counts.items(), key=lambda x: x[1], reverse=True)[:limit]
+    
+    def dumps(self):
+        return json.dumps({"capacity": self.capacity, "counts": self.counts, "errors": self.errors})
+    
+    @classmethod
+    def loads(cls, text):
+        state = json.loads(text)
+        sketch = cls(state["capacity"])
+        sketch.counts = state["counts"]
+        sketch.errors = state["errors"]
+        return sketch
+
+class HyperLogLog:
+    """HyperLogLog distinct-count estimator in 2**precision one-byte registers."""
+    
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(1 << precision)
+    
+    def add(self, item):
+        h = int.from_bytes(hashlib.blake2b(str(item).encode(), digest_size=8).digest(), 'big')
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+    
+    def merge(self, other):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+    
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction: linear counting
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+    
+    def dumps(self):
+        return bytes(self.registers)
+    
+    @classmethod
+    def loads(cls, data):
+        return cls(int(math.log2(len(data))), data)
+
+def widget_key(widget, value):
+    """Display key for a widget event, e.g. 'Select Industry - Manufacturing'."""
+    return f"{widget} - {value}" if value else widget
+
+def split_widget_key(key):
+    """Recover (widget, value) from a display key written before they were stored apart."""
+    for widget in [*WIDGET_AGGREGATES, *LEGACY_WIDGETS]:
+        if key == widget:
+            return widget, ""
+        if key.startswith(f"{widget} - "):
+            return widget, key[len(widget) + 3:]
+    widget, _, value = key.partition(" - ")
+    return widget, value
+
+def aggregate_for(widget, value):
+    """The (category, value) aggregate a widget event counts towards, or None."""
+    if widget not in WIDGET_AGGREGATES:
+        return None
+    category, fixed_value = WIDGET_AGGREGATES[widget]
+    value = fixed_value or value.strip()
+    if value in PLACEHOLDER_VALUES:
+        return None
+    return category, value
+
+def default_data():
+    """Empty analytics aggregate."""
+    return {"total_pageviews": 0, "counts": {}, "aggregates": {}, "search_history": []}
+
+def add_aggregate(data, widget, value, count):
+    aggregate = aggregate_for(widget, value)
+    if aggregate is not None:
+        category, value = aggregate
+        values = data.setdefault("aggregates", {}).setdefault(category, {})
+        values[value] = values.get(value, 0) + count
+
+def apply_event(data, event):
+    """Fold one logged event into an analytics aggregate."""
+    kind = event["event"]
+    if kind == "pageview":
+        data["total_pageviews"] = data.get("total_pageviews", 0) + 1
+    elif kind == "widget":
+        if "widget" in event:
+            widget, value = event["widget"], event["value"]
+        else:
+            # Logged before widget and value were recorded separately
+            widget, value = split_widget_key(event["key"])
+        counts = data.setdefault("counts", {})
+        key = widget_key(widget, value)
+        counts[key] = counts.get(key, 0) + 1
+        add_aggregate(data, widget, value, 1)
+    elif kind == "search":
+        history = data.setdefault("search_history", [])
+        history.append({key: event[key] for key in ("type", "value", "timestamp")})
+        
+        # Keep only the most recent searches
+        del history[:-SEARCH_HISTORY_LIMIT]
+
+class EventLogStore:
+    """Analytics storage backed by an append-only event log.
+    
+    Every tracked event is appended as one JSON line to the event log, so
+    recording an event costs a constant-size write however large the history
+    is. The aggregate (page views, widget counts, recent searches) lives in
+    the snapshot file; every COMPACT_EVERY events the log is folded into it
+    and truncated. Readers see snapshot + replayed log.
+    """
+    
+    def __init__(self, filename="analytics_data.json", log_filename=None, compact_every=COMPACT_EVERY):
+        self.filename = filename
+        self.log_filename = log_filename or f"{os.path.splitext(filename)[0]}_events.jsonl"
+        self.compact_every = compact_every
+        self.pending_events = 0
+        self.data = self.load_data()
+    
+    def load_snapshot(self):
+        """Load the compacted aggregate, or an empty one."""
+        if os.path.exists(self.filename):
+            try:
+                with open(self.filename, 'r') as f:
+                    data = json.load(f)
+                if "aggregates" not in data:
+                    # Snapshot from before aggregates were kept
+                    for key, count in data.get("counts", {}).items():
+                        add_aggregate(data, *split_widget_key(key), count)
+                return data
+            except:
+                pass
+        return default_data()
+    
+    def replay(self, data, log_path):
+        """Apply every event in a log file to data; returns the number of events."""
+        applied = 0
+        try:
+            with open(log_path, 'r') as f:
+                for line in f:
+                    try:
+                        apply_event(data, json.loads(line))
+                        applied += 1
+                    except (ValueError, KeyError, TypeError):
+                        # Skip a torn or malformed line
+                        continue
+        except OSError:
+            pass
+        return applied
+    
+    def leftover_logs(self, data):
+        """Logs renamed by a compaction that were not folded into data's snapshot."""
+        directory = os.path.dirname(self.log_filename) or '.'
+        prefix = os.path.basename(self.log_filename) + '.'
+        folded = set(data.get("compacted_logs", []))
+        leftovers = []
+        for name in sorted(os.listdir(directory)):
+            if name.startswith(prefix) and name.endswith('.compacting'):
+                token = name[len(prefix):-len('.compacting')]
+                if token not in folded:
+                    leftovers.append((token, os.path.join(directory, name)))
+        return leftovers
+    
+    def load_data(self):
+        """Load existing analytics data: the snapshot plus any events logged since."""
+        data = self.load_snapshot()
+        for _, path in self.leftover_logs(data):
+            self.replay(data, path)
+        self.pending_events = self.replay(data, self.log_filename)
+        data.pop("compacted_logs", None)
+        return data
+    
+    def append_event(self, event):
+        """Record an event in memory and append it to the log."""
+        apply_event(self.data, event)
+        line = json.dumps(event, separators=(',', ':')) + '\n'
+        try:
+            while True:
+                with open(self.log_filename, 'a') as f:
+                    if fcntl is not None:
+                        fcntl.flock(f, fcntl.LOCK_SH)
+                        # The log was renamed for compaction after we opened it; reopen
+                        try:
+                            current = os.stat(self.log_filename).st_ino
+                        except FileNotFoundError:
+                            continue
+                        if os.fstat(f.fileno()).st_ino != current:
+                            continue
+                    f.write(line)
+                break
+        except:
+            return
+        self.pending_events += 1
+        if self.pending_events >= self.compact_every:
+            self.compact()
+    
+    def acquire_compaction_lock(self):
+        """Take the compaction lock file; a lock older than LOCK_TIMEOUT is considered abandoned."""
+        lock_path = f"{self.log_filename}.lock"
+        for _ in range(2):
+            try:
+                os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return lock_path
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(lock_path) < LOCK_TIMEOUT:
+                        return None
+                    os.remove(lock_path)
+                except OSError:
+                    return None
+            except OSError:
+                return None
+        return None
+    
+    def compact(self):
+        """Fold the event log into the snapshot and start a new log."""
+        lock_path = self.acquire_compaction_lock()
+        if lock_path is None:
+            # Another session is compacting; its fold will include our events
+            return
+        
+        try:
+            token = str(time.time_ns())
+            try:
+                os.rename(self.log_filename, f"{self.log_filename}.{token}.compacting")
+            except FileNotFoundError:
+                pass
+            
+            # Re-read from disk so events logged by other sessions are kept
+            data = self.load_snapshot()
+            leftovers = self.leftover_logs(data)
+            for _, path in leftovers:
+                with open(path, 'r') as f:
+                    # Wait for appends that opened the log before it was renamed
+                    if fcntl is not None:
+                        fcntl.flock(f, fcntl.LOCK_EX)
+                    self.replay(data, path)
+            data["compacted_logs"] = [token for token, _ in leftovers]
+            
+            tmp_path = f"{self.filename}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp_path, self.filename)
+            for _, path in leftovers:
+                os.remove(path)
+            
+            # Pick up anything appended while we were folding
+            data.pop("compacted_logs")
+            self.pending_events = self.replay(data, self.log_filename)
+            self.data = data
+        except:
+            pass
+        finally:
+            os.remove(lock_path)
+    
+    # Storage interface shared with SQLiteStore
+    
+    def record_pageview(self, session_id=None):
+        self.append_event({"event": "pageview"})
+    
+    def increment(self, widget, value=""):
+        self.append_event({"event": "widget", "widget": widget, "value": value})
+    
+    def add_search(self, search_type, value, timestamp):
+        self.append_event({"event": "search", "type": search_type, "value": value, "timestamp": timestamp})
+    
+    def apply_batch(self, pageviews, counts, searches, sessions=(), search_counts=None):
+        for _ in range(pageviews):
+            self.record_pageview()
+        for (widget, value), count in counts.items():
+            for _ in range(count):
+                self.increment(widget, value)
+        for search in searches:
+            self.add_search(*search)
+    
+    def trend(self, resolution, since):
+        # The event log keeps no time buckets
+        return []
+    
+    def is_empty(self):
+        return not os.path.exists(self.filename) and not os.path.exists(self.log_filename)
+    
+    def summary(self):
+        counts = self.data.get("counts", {})
+        return {
+            "total_pageviews": self.data.get("total_pageviews", 0),
+            "total_interactions": sum(counts.values()),
+            "unique_widgets": len(counts)
+        }
+    
+    def top_counts(self, limit):
+        counts = self.data.get("counts", {})
+        return sorted(counts.items(), key=lambda x: x[1], reverse=True)[:limit]
+    
+    def aggregate(self, category, limit):
+        values = self.data.get("aggregates", {}).get(category, {})
+        return sorted(values.items(), key=lambda x: x[1], reverse=True)[:limit]
+    
+    def top_searches(self, search_type, limit, week=None):
+        # No sketches here: count the retained search history
+        counts = {}
+        for search in self.data.get("search_history", []):
+            if search["type"] == search_type and (week is None or week_key(datetime.fromisoformat(search["timestamp"])) == week):
+                counts[search["value"]] = counts.get(search["value"], 0) + 1
+        return sorted(counts.items(), key=lambda x: x[1], reverse=True)[:limit]
+    
+    def distinct_sessions(self, week=None):
+        # Sessions are not recorded by the event log
+        return None
+    
+    def recent_searches(self, limit):
+        return [dict(search) for search in self.data.get("search_history", [])[-limit:]]
+    
+    def widget_page(self, offset, limit):
+        rows = [(*split_widget_key(key), count) for key, count in self.top_counts(-1)]
+        return rows[offset:offset + limit]
+    
+    def bucket_rows(self, resolution, since, until):
+        # The event log keeps no time buckets
+        return []
+    
+    def export(self):
+        return self.data
+
+class SQLiteStore:
+    """Analytics storage in a SQLite database in WAL mode.
+    
+    Counters are updated with single-statement upserts, so concurrent
+    sessions (threads or processes) never lose each other's increments, and
+    WAL lets readers such as the dashboard run while sessions write. The
+    dashboard's aggregates are computed in SQL.
+    """
+    
+    def __init__(self, path=ANALYTICS_DB, legacy_filename="analytics_data.json",
+                 hourly_retention_days=HOURLY_RETENTION_DAYS, daily_retention_days=DAILY_RETENTION_DAYS,
+                 sketch_retention_weeks=SKETCH_RETENTION_WEEKS):
+        self.path = path
+        self.sketch_retention = timedelta(weeks=sketch_retention_weeks)
+        self.hourly_retention = timedelta(days=hourly_retention_days)
+        self.daily_retention = timedelta(days=daily_retention_days)
+        self.last_downsample = 0.0
+        self.local = threading.local()
+        # WAL is a property of the database file, so it is set once here
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.create_schema(legacy_filename)
+    
+    @property
+    def conn(self):
+        """This thread's connection to the database, opened on first use.
+        
+        Each thread (the flusher, every session's script thread) gets its own
+        connection, so a dashboard read never runs inside another thread's
+        open transaction; WAL gives each read a consistent snapshot.
+        """
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(BUSY_TIMEOUT * 1000)}")
+            self.local.conn = conn
+        return conn
+    
+    def create_schema(self, legacy_filename):
+        """Create missing tables, importing older analytics data once if present."""
+        with self.transaction():
+            tables = {row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+            # Plain execute calls: executescript would commit the open transaction
+            self.conn.execute("CREATE TABLE IF NOT EXISTS totals (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS widget_counts (
+                    widget TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (widget, value)
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS aggregates (
+                    category TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (category, value)
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS aggregates_top ON aggregates (category, count)")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS search_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    type TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    timestamp TEXT NOT NULL
+                )
+            """)
+            keyed_buckets = "buckets" in tables and "key" in {
+                row[1] for row in self.conn.execute("PRAGMA table_info(buckets)")
+            }
+            if keyed_buckets:
+                # Buckets from before widget and value were stored separately
+                self.conn.execute("ALTER TABLE buckets RENAME TO buckets_keyed")
+            # Hourly buckets start 'YYYY-MM-DDTHH:00', daily ones 'YYYY-MM-DD', so
+            # grouping by the first 10 characters yields days at either resolution
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS buckets (
+                    resolution TEXT NOT NULL,
+                    start TEXT NOT NULL,
+                    widget TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (resolution, start, widget, value)
+                ) WITHOUT ROWID
+            """)
+            if keyed_buckets:
+                rows = self.conn.execute("SELECT resolution, start, key, count FROM buckets_keyed")
+                self.conn.executemany(
+                    "INSERT INTO buckets VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(resolution, start, widget, value) DO UPDATE SET count = count + excluded.count",
+                    [(resolution, start, *(split_widget_key(key) if key != PAGEVIEW_BUCKET else (PAGEVIEW_BUCKET, "")),
+                      count) for resolution, start, key, count in rows]
+                )
+                self.conn.execute("DROP TABLE buckets_keyed")
+            # Space-Saving and HyperLogLog sketches: 'top:<search type>:<week or all>', 'hll:<week or all>'
+            self.conn.execute("CREATE TABLE IF NOT EXISTS sketches (name TEXT PRIMARY KEY, data BLOB NOT NULL)")
+            if "counts" in tables:
+                # Database from before widget and value were stored separately
+                self.add_counts(self.split_counts(self.conn.execute("SELECT key, count FROM counts")))
+                self.conn.execute("DROP TABLE counts")
+            elif "totals" not in tables and legacy_filename and os.path.exists(legacy_filename):
+                legacy = EventLogStore(legacy_filename).data
+                self.conn.execute("INSERT INTO totals VALUES ('pageviews', ?)", (legacy.get("total_pageviews", 0),))
+                self.add_counts(self.split_counts(legacy.get("counts", {}).items()))
+                self.conn.executemany(
+                    "INSERT INTO search_history (type, value, timestamp) VALUES (?, ?, ?)",
+                    [(s["type"], s["value"], s["timestamp"]) for s in legacy.get("search_history", [])]
+                )
+            if "sketches" not in tables:
+                self.seed_sketches()
+    
+    def seed_sketches(self):
+        """Start the all-time top-K sketches from exact occupation and industry counts."""
+        search_types = {"Choose an occupation": "occupation", "Choose up to 3 occupations": "occupation",
+                        "Select Industry": "industry"}
+        sketches = {}
+        rows = self.conn.execute("SELECT widget, value, count FROM widget_counts ORDER BY count DESC")
+        for widget, value, count in rows:
+            if widget in search_types and value.strip() not in PLACEHOLDER_VALUES:
+                sketch = sketches.setdefault(search_types[widget], SpaceSaving())
+                sketch.add(value.strip(), count)
+        for search_type, sketch in sketches.items():
+            self.save_sketch(f"top:{search_type}:all", sketch)
+        # These aggregates are superseded by the sketches
+        self.conn.execute("DELETE FROM aggregates WHERE category IN ('occupation', 'industry')")
+    
+    def load_sketch(self, name, sketch_class):
+        row = self.conn.execute("SELECT data FROM sketches WHERE name = ?", (name,)).fetchone()
+        return sketch_class.loads(row[0]) if row else sketch_class()
+    
+    def save_sketch(self, name, sketch):
+        self.conn.execute(
+            "INSERT INTO sketches VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET data = excluded.data",
+            (name, sketch.dumps())
+        )
+    
+    @staticmethod
+    def split_counts(pairs):
+        counts = {}
+        for key, count in pairs:
+            widget, value = split_widget_key(key)
+            counts[widget, value] = counts.get((widget, value), 0) + count
+        return counts
+    
+    @contextmanager
+    def transaction(self):
+        """Run statements in one write transaction (taken up front to avoid upgrade deadlocks)."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except:
+            self.conn.execute("ROLLBACK")
+            raise
+        else:
+            self.conn.execute("COMMIT")
+    
+    def record_pageview(self, session_id=None):
+        self.apply_batch(1, {}, [], sessions=[session_id] if session_id else [])
+    
+    def increment(self, widget, value=""):
+        self.apply_batch(0, {(widget, value): 1}, [])
+    
+    def add_search(self, search_type, value, timestamp):
+        self.apply_batch(0, {}, [(search_type, value, timestamp)])
+    
+    def add_counts(self, counts):
+        """Add {(widget, value): count} to the widget counts, dashboard aggregates and totals."""
+        self.conn.executemany(
+            "INSERT INTO widget_counts VALUES (?, ?, ?) "
+            "ON CONFLICT(widget, value) DO UPDATE SET count = count + excluded.count",
+            [(widget, value, count) for (widget, value), count in counts.items()]
+        )
+        aggregates = {}
+        for (widget, value), count in counts.items():
+            aggregate = aggregate_for(widget, value)
+            if aggregate is not None:
+                aggregates[aggregate] = aggregates.get(aggregate, 0) + count
+        self.conn.executemany(
+            "INSERT INTO aggregates VALUES (?, ?, ?) "
+            "ON CONFLICT(category, value) DO UPDATE SET count = count + excluded.count",
+            [(category, value, count) for (category, value), count in aggregates.items()]
+        )
+        if counts:
+            self.conn.execute(
+                "INSERT INTO totals VALUES ('interactions', ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                (sum(counts.values()),)
+            )
+    
+    def apply_batch(self, pageviews, counts, searches, sessions=(), search_counts=None):
+        """Apply buffered events in a single transaction.
+        
+        counts maps (widget, value) to a count. Besides the all-time totals
+        and aggregates, the events are added to the current hour's bucket.
+        searches are (type, value, timestamp) tuples; search_counts maps
+        (type, value) to a count when searches holds only the latest of them.
+        sessions are session ids seen, for the distinct-session estimate.
+        """
+        hour = datetime.now().strftime("%Y-%m-%dT%H:00")
+        if search_counts is None:
+            search_counts = {}
+            for search_type, value, _ in searches:
+                search_counts[search_type, value] = search_counts.get((search_type, value), 0) + 1
+        with self.transaction():
+            if pageviews:
+                self.conn.execute(
+                    "INSERT INTO totals VALUES ('pageviews', ?) "
+                    "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                    (pageviews,)
+                )
+            self.add_counts(counts)
+            bucket_counts = [(widget, value, count) for (widget, value), count in counts.items()]
+            if pageviews:
+                bucket_counts.append((PAGEVIEW_BUCKET, "", pageviews))
+            self.conn.executemany(
+                "INSERT INTO buckets VALUES ('hour', ?, ?, ?, ?) "
+                "ON CONFLICT(resolution, start, widget, value) DO UPDATE SET count = count + excluded.count",
+                [(hour, widget, value, count) for widget, value, count in bucket_counts]
+            )
+            if searches:
+                self.conn.executemany(
+                    "INSERT INTO search_history (type, value, timestamp) VALUES (?, ?, ?)", searches
+                )
+                self.conn.execute(
+                    "DELETE FROM search_history WHERE id <= (SELECT MAX(id) FROM search_history) - ?",
+                    (SEARCH_HISTORY_LIMIT,)
+                )
+            self.update_sketches(search_counts, sessions)
+        if time.time() - self.last_downsample >= DOWNSAMPLE_INTERVAL:
+            # The batch is committed by now; a failed downsample is retried with the next one
+            try:
+                self.downsample()
+            except:
+                pass
+    
+    def update_sketches(self, search_counts, sessions):
+        """Add searches and sessions to the all-time and this week's sketches."""
+        scopes = ["all", week_key()]
+        for search_type in {search_type for search_type, _ in search_counts}:
+            for scope in scopes:
+                name = f"top:{search_type}:{scope}"
+                sketch = self.load_sketch(name, SpaceSaving)
+                for (kind, value), count in search_counts.items():
+                    if kind == search_type:
+                        sketch.add(value, count)
+                self.save_sketch(name, sketch)
+        if sessions:
+            for scope in scopes:
+                name = f"hll:{scope}"
+                sketch = self.load_sketch(name, HyperLogLog)
+                for session_id in sessions:
+                    sketch.add(session_id)
+                self.save_sketch(name, sketch)
+    
+    def downsample(self, now=None):
+        """Roll hourly buckets past retention into daily ones and drop expired days."""
+        now = now or datetime.now()
+        hourly_cutoff = (now - self.hourly_retention).strftime("%Y-%m-%dT%H:00")
+        daily_cutoff = (now - self.daily_retention).strftime("%Y-%m-%d")
+        with self.transaction():
+            # The SELECT's WHERE clause lets SQLite parse ON CONFLICT as an upsert
+            self.conn.execute(
+                "INSERT INTO buckets "
+                "SELECT 'day', substr(start, 1, 10), widget, value, SUM(count) FROM buckets "
+                "WHERE resolution = 'hour' AND start < ? GROUP BY substr(start, 1, 10), widget, value "
+                "ON CONFLICT(resolution, start, widget, value) DO UPDATE SET count = count + excluded.count",
+                (hourly_cutoff,)
+            )
+            self.conn.execute("DELETE FROM buckets WHERE resolution = 'hour' AND start < ?", (hourly_cutoff,))
+            self.conn.execute("DELETE FROM buckets WHERE resolution = 'day' AND start < ?", (daily_cutoff,))
+            # Week keys sort chronologically; 'all' sketches never match the pattern
+            self.conn.execute(
+                "DELETE FROM sketches WHERE name GLOB '*:[0-9][0-9][0-9][0-9]-W[0-9][0-9]' AND substr(name, -8) < ?",
+                (week_key(now - self.sketch_retention),)
+            )
+        self.last_downsample = time.time()
+    
+    def trend(self, resolution, since):
+        """(bucket start, page views, interactions) per hour or day from since onwards."""
+        if resolution == "hour":
+            bucket, where = "start", "resolution = 'hour' AND start >= ?"
+            since = since.strftime("%Y-%m-%dT%H:00")
+        else:
+            bucket, where = "substr(start, 1, 10)", "start >= ?"
+            since = since.strftime("%Y-%m-%d")
+        return self.conn.execute(
+            f"SELECT {bucket} AS bucket, "
+            f"SUM(CASE WHEN widget = ? THEN count ELSE 0 END), "
+            f"SUM(CASE WHEN widget != ? THEN count ELSE 0 END) "
+            f"FROM buckets WHERE {where} GROUP BY bucket ORDER BY bucket",
+            (PAGEVIEW_BUCKET, PAGEVIEW_BUCKET, since)
+        ).fetchall()
+    
+    def is_empty(self):
+        return self.conn.execute("SELECT COUNT(*) FROM totals").fetchone()[0] == 0
+    
+    def summary(self):
+        totals = dict(self.conn.execute("SELECT name, value FROM totals"))
+        widgets = self.conn.execute("SELECT COUNT(*) FROM widget_counts").fetchone()[0]
+        return {
+            "total_pageviews": totals.get("pageviews", 0),
+            "total_interactions": totals.get("interactions", 0),
+            "unique_widgets": widgets
+        }
+    
+    def top_counts(self, limit):
+        rows = self.conn.execute(
+            "SELECT widget, value, count FROM widget_counts ORDER BY count DESC LIMIT ?", (limit,)
+        )
+        return [(widget_key(widget, value), count) for widget, value, count in rows]
+    
+    def aggregate(self, category, limit):
+        """Top (value, count) pairs of a dashboard aggregate."""
+        return self.conn.execute(
+            "SELECT value, count FROM aggregates WHERE category = ? ORDER BY count DESC LIMIT ?",
+            (category, limit)
+        ).fetchall()
+    
+    def top_searches(self, search_type, limit, week=None):
+        """Estimated most searched values, all time or in one week ('YYYY-Www')."""
+        sketch = self.load_sketch(f"top:{search_type}:{week or 'all'}", SpaceSaving)
+        return sketch.top(limit)
+    
+    def distinct_sessions(self, week=None):
+        """Estimated number of distinct sessions, all time or in one week."""
+        return self.load_sketch(f"hll:{week or 'all'}", HyperLogLog).count()
+    
+    def recent_searches(self, limit):
+        rows = self.conn.execute(
+            "SELECT type, value, timestamp FROM search_history ORDER BY id DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [{"type": t, "value": v, "timestamp": ts} for t, v, ts in reversed(rows)]
+    
+    def widget_page(self, offset, limit):
+        """(widget, value, count) rows, most used first."""
+        return self.conn.execute(
+            "SELECT widget, value, count FROM widget_counts ORDER BY count DESC, widget, value LIMIT ? OFFSET ?",
+            (limit, offset)
+        ).fetchall()
+    
+    def bucket_rows(self, resolution, since, until):
+        """(period, widget, value, count) per hour or day for dates since <= day < until ('YYYY-MM-DD')."""
+        if resolution == "hour":
+            query = ("SELECT start, widget, value, count FROM buckets "
+                     "WHERE resolution = 'hour' AND start >= ? AND start < ? ORDER BY start, widget, value")
+        else:
+            query = ("SELECT substr(start, 1, 10) AS day, widget, value, SUM(count) FROM buckets "
+                     "WHERE start >= ? AND start < ? GROUP BY day, widget, value ORDER BY day, widget, value")
+        return self.conn.execute(query, (since, until)).fetchall()
+    
+    def compact(self):
+        """Downsample, rebuild the file to reclaim free pages, then empty the WAL."""
+        self.downsample()
+        # In WAL mode VACUUM writes the rebuilt pages to the WAL, so checkpoint afterwards
+        self.conn.execute("VACUUM")
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    
+    def export(self):
+        return {
+            "total_pageviews": self.summary()["total_pageviews"],
+            "counts": dict(self.top_counts(-1)),
+            "aggregates": {
+                category: dict(self.aggregate(category, -1))
+                for category in sorted({category for category, _ in WIDGET_AGGREGATES.values()})
+            },
+            "search_history": self.recent_searches(SEARCH_HISTORY_LIMIT)
+        }
+
+def open_store(backend="sqlite"):
+    """Open the analytics store: 'sqlite' (default) or 'jsonl' (event log files)."""
+    if backend == "jsonl":
+        return EventLogStore()
+    return SQLiteStore()
+
+# Simple analytics tracking system
+class SimpleAnalytics:
+    """Page view, widget and search tracking on top of a storage backend."""
+    
+    def __init__(self, store=None):
+        self.store = store if store is not None else open_store()
+    
+    def track_pageview(self, session_id=None):
+        """Track a page view, counting session_id towards distinct sessions."""
+        try:
+            self.store.record_pageview(session_id)
+        except:
+            pass
+    
+    def track_widget(self, widget_name, value=None):
+        """Track widget interaction."""
+        value = "" if value is None else str(value)
+        try:
+            self.store.increment(widget_name, value)
+        except:
+            pass
+    
+    def track_search(self, search_type, search_value):
+        """Track a search with timestamp."""
+        if not search_value or search_value == "-- Select an occupation --":
+            return
+        
+        try:
+            # search_type is "occupation" or "industry"
+            self.store.add_search(search_type, search_value, datetime.now().isoformat())
+        except:
+            pass
+    
+    def load_searches(self):
+        """Stored searches, oldest first."""
+        return self.store.recent_searches(SEARCH_HISTORY_LIMIT)
+    
+    def get_recent_searches(self, limit=10):
+        """Get recent searches with relative timestamps."""
+        try:
+            searches = self.load_searches()
+            
+            # Filter out invalid searches and add relative time formatting
+            valid_searches = []
+            for search in searches:
+                try:
+                    # Ensure search has required fields
+                    if not all(key in search for key in ["type", "value", "timestamp"]):
+                        continue
+                    
+                    # Skip empty or placeholder values
+                    if not search["value"] or search["value"] == "-- Select an occupation --":
+                        continue
+                    
+                    timestamp = datetime.fromisoformat(search["timestamp"])
+                    now = datetime.now()
+                    diff = now - timestamp
+                    
+                    if diff.total_seconds() < 60:
+                        search["relative_time"] = "Just now"
+                    elif diff.total_seconds() < 3600:
+                        minutes = int(diff.total_seconds() / 60)
+                        search["relative_time"] = f"{minutes}m ago"
+                    elif diff.total_seconds() < 86400:
+                        hours = int(diff.total_seconds() / 3600)
+                        search["relative_time"] = f"{hours}h ago"
+                    else:
+                        days = int(diff.total_seconds() / 86400)
+                        search["relative_time"] = f"{days}d ago"
+                    
+                    valid_searches.append(search)
+                except:
+                    # Skip invalid search entries
+                    continue
+            
+            return valid_searches[-limit:][::-1]  # Return last N searches, newest first
+        except:
+            return []  # Return empty list if any error occurs
+    
+    def recent_feed(self, limit=10):
+        """Latest searched values per search type, newest first."""
+        feed = {}
+        for search in reversed(self.load_searches()):
+            values = feed.setdefault(search["type"], [])
+            if len(values) < limit:
+                values.append(search["value"])
+        return feed
+
+
+class SessionTracker:
+    """Records a session's widget values only when they change.
+    
+    Streamlit reruns the whole script on every interaction, so tracking
+    widgets unconditionally counts the current industry and wage type again
+    on every unrelated click. The last recorded value of each widget is kept
+    in the session's state mapping (st.session_state) and events are only
+    passed on to the analytics service when it differs.
+    """
+    
+    STATE_KEY = "analytics_last_values"
+    
+    def __init__(self, analytics, state):
+        self.analytics = analytics
+        self.last_values = state.setdefault(self.STATE_KEY, {})
+    
+    def changed(self, widget_name, value):
+        """Remember value for widget_name; True if it differs from the last one seen."""
+        if widget_name in self.last_values and self.last_values[widget_name] == value:
+            return False
+        self.last_values[widget_name] = value
+        return True
+    
+    def track_widget(self, widget_name, value, search_type=None):
+        """Track a widget value, and a search of search_type, if the value changed."""
+        if not self.changed(widget_name, value):
+            return
+        self.analytics.track_widget(widget_name, value)
+        if search_type is not None:
+            self.analytics.track_search(search_type, value)
+
+
+class BufferedAnalytics(SimpleAnalytics):
+    """Process-wide analytics whose tracking calls never touch the disk.
+    
+    Tracking only puts an event on a bounded queue. A background thread folds
+    queued events into in-memory counters and writes them to the store in one
+    batch once FLUSH_SIZE events are pending or FLUSH_INTERVAL seconds have
+    passed, and a final time at interpreter exit. If the queue is full the
+    event is discarded and counted in `dropped`. A batch the store fails to
+    write is kept pending and retried with the next flush.
+    
+    The latest searches of each type are also kept in in-memory ring
+    buffers, so the recent-search feed never reads the store.
+    """
+    
+    def __init__(self, store=None, flush_interval=FLUSH_INTERVAL, flush_size=FLUSH_SIZE, queue_size=QUEUE_SIZE):
+        super().__init__(store)
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.failed_flushes = 0
+        self.lock = threading.Lock()        # guards the pending batch
+        self.flush_lock = threading.Lock()  # one store write at a time
+        self.pending = self.empty_batch()
+        self.recent = {}
+        try:
+            for search in self.store.recent_searches(SEARCH_HISTORY_LIMIT):
+                self.recent_buffer(search["type"]).append(search["value"])
+        except:
+            pass
+        self.stopped = threading.Event()
+        self.worker = threading.Thread(target=self.run, name="analytics-flusher", daemon=True)
+        self.worker.start()
+        atexit.register(self.close)
+    
+    @staticmethod
+    def empty_batch():
+        return {"events": 0, "pageviews": 0, "counts": {}, "searches": [], "search_counts": {}, "sessions": set()}
+    
+    @staticmethod
+    def merge_batch(batch, newer):
+        """Fold the newer pending batch into an older one that failed to write."""
+        batch["events"] += newer["events"]
+        batch["pageviews"] += newer["pageviews"]
+        for field in ("counts", "search_counts"):
+            for key, count in newer[field].items():
+                batch[field][key] = batch[field].get(key, 0) + count
+        batch["searches"].extend(newer["searches"])
+        del batch["searches"][:-SEARCH_HISTORY_LIMIT]
+        batch["sessions"] |= newer["sessions"]
+        return batch
+    
+    def enqueue(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+    
+    def track_pageview(self, session_id=None):
+        """Track a page view, counting session_id towards distinct sessions."""
+        self.enqueue(("pageview", session_id))
+    
+    def track_widget(self, widget_name, value=None):
+        """Track widget interaction."""
+        value = "" if value is None else str(value)
+        self.enqueue(("widget", widget_name, value))
+    
+    def track_search(self, search_type, search_value):
+        """Track a search with timestamp."""
+        if not search_value or search_value == "-- Select an occupation --":
+            return
+        self.recent_buffer(search_type).append(search_value)
+        self.enqueue(("search", search_type, search_value, datetime.now().isoformat()))
+    
+    def recent_buffer(self, search_type):
+        """Ring buffer of the latest values searched as search_type, oldest first."""
+        buffer = self.recent.get(search_type)
+        if buffer is None:
+            with self.lock:
+                buffer = self.recent.setdefault(search_type, deque(maxlen=RECENT_SEARCHES_PER_TYPE))
+        return buffer
+    
+    def recent_feed(self, limit=10):
+        """Latest searched values per search type, newest first."""
+        # list() of a deque runs without releasing the GIL, so appends cannot interleave
+        return {search_type: list(buffer)[::-1][:limit] for search_type, buffer in list(self.recent.items())}
+    
+    def absorb(self, event):
+        """Fold one queued event into the pending batch."""
+        with self.lock:
+            batch = self.pending
+            kind = event[0]
+            if kind == "pageview":
+                batch["pageviews"] += 1
+                if event[1]:
+                    batch["sessions"].add(event[1])
+            elif kind == "widget":
+                key = event[1:]
+                batch["counts"][key] = batch["counts"].get(key, 0) + 1
+            elif kind == "search":
+                batch["searches"].append(event[1:])
+                del batch["searches"][:-SEARCH_HISTORY_LIMIT]
+                key = event[1:3]
+                batch["search_counts"][key] = batch["search_counts"].get(key, 0) + 1
+            else:
+                return
+            batch["events"] += 1
+    
+    def drain(self):
+        while True:
+            try:
+                self.absorb(self.queue.get_nowait())
+            except queue.Empty:
+                return
+    
+    def flush(self):
+        """Write everything queued so far to the store."""
+        with self.flush_lock:
+            self.drain()
+            with self.lock:
+                batch, self.pending = self.pending, self.empty_batch()
+            if batch["events"]:
+                try:
+                    self.store.apply_batch(batch["pageviews"], batch["counts"], batch["searches"],
+                                           batch["sessions"], batch["search_counts"])
+                except:
+                    # Keep the batch (e.g. after a busy timeout) and retry it on the next flush
+                    self.failed_flushes += 1
+                    with self.lock:
+                        self.pending = self.merge_batch(batch, self.pending)
+    
+    def run(self):
+        """Flusher thread: absorb events, flush on the size or time threshold."""
+        last_flush = time.monotonic()
+        while not self.stopped.is_set():
+            timeout = max(0.0, last_flush + self.flush_interval - time.monotonic())
+            try:
+                self.absorb(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                pass
+            if self.pending["events"] >= self.flush_size or time.monotonic() - last_flush >= self.flush_interval:
+                self.flush()
+                last_flush = time.monotonic()
+    
+    def close(self):
+        """Stop the flusher thread and write out whatever is still buffered."""
+        self.stopped.set()
+        self.enqueue(("stop",))
+        self.worker.join(timeout=self.flush_interval)
+        self.flush()
+    
+    def load_searches(self):
+        """Stored searches followed by any not yet flushed."""
+        searches = super().load_searches()
+        with self.lock:
+            pending = list(self.pending["searches"])
+        searches.extend({"type": t, "value": v, "timestamp": ts} for t, v, ts in pending)
+        return searches[-SEARCH_HISTORY_LIMIT:]
+
+def database_size(path):
+    """Bytes used by a SQLite database including its WAL file."""
+    return sum(os.path.getsize(p) for p in (path, f"{path}-wal") if os.path.exists(p))
+
+def export_buckets(store, path, since, until, resolution="day", file_format=None):
+    """Write time-bucketed counts for since <= day <= until to CSV or Parquet; returns the row count."""
+    import pandas as pd
+    
+    until = (datetime.strptime(until, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+    rows = [
+        (period, "pageview" if widget == PAGEVIEW_BUCKET else "widget", widget, value, count)
+        for period, widget, value, count in store.bucket_rows(resolution, since, until)
+    ]
+    frame = pd.DataFrame(rows, columns=["period", "event", "widget", "value", "count"])
+    file_format = file_format or ("parquet" if path.endswith(".parquet") else "csv")
+    if file_format == "parquet":
+        frame.to_parquet(path, index=False)
+    else:
+        frame.to_csv(path, index=False)
+    return len(frame)
+
+def print_summary(store):
+    """Print totals, top widgets, aggregates, popular searches and recent activity."""
+    summary = store.summary()
+    print(f"Page views:        {summary['total_pageviews']:,}")
+    print(f"Interactions:      {summary['total_interactions']:,}")
+    print(f"Unique widgets:    {summary['unique_widgets']:,}")
+    sessions = store.distinct_sessions()
+    if sessions is not None:
+        print(f"Unique sessions:   ~{sessions:,} (this week ~{store.distinct_sessions(week_key()):,})")
+    if isinstance(store, SQLiteStore):
+        print(f"Database size:     {database_size(store.path) / 1024:,.0f} KB")
+    
+    print("\nTop widgets:")
+    for key, count in store.top_counts(10):
+        print(f"  {count:>8,}  {key}")
+    for category in sorted({category for category, _ in WIDGET_AGGREGATES.values()}):
+        values = ", ".join(f"{value} ({count:,})" for value, count in store.aggregate(category, 5))
+        print(f"{category}: {values or '-'}")
+    for search_type in ("occupation", "industry"):
+        values = ", ".join(f"{value} ({count:,})" for value, count in store.top_searches(search_type, 5))
+        print(f"Top {search_type} searches: {values or '-'}")
+    
+    trend = store.trend("day", datetime.now() - timedelta(days=7))
+    if trend:
+        print("\nLast 7 days (page views / interactions):")
+        for day, pageviews, interactions in trend:
+            print(f"  {day}  {pageviews:>8,}  {interactions:>8,}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Singapore wage app analytics")
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.add_parser('summary', help="print summary statistics")
+    subparsers.add_parser('compact', help="fold old history into compact form and reclaim space")
+    export_parser = subparsers.add_parser('export', help="export time-bucketed counts to CSV or Parquet")
+    export_parser.add_argument('output', help="output file (.csv or .parquet)")
+    export_parser.add_argument('--since', default=(datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d"),
+                               help="first day to export, YYYY-MM-DD (default: 30 days ago)")
+    export_parser.add_argument('--until', default=datetime.now().strftime("%Y-%m-%d"),
+                               help="last day to export, YYYY-MM-DD (default: today)")
+    export_parser.add_argument('--resolution', choices=['day', 'hour'], default='day')
+    export_parser.add_argument('--format', choices=['csv', 'parquet'], help="default: from the file extension")
+    prune_parser = subparsers.add_parser('prune', help="apply the retention policy now")
+    prune_parser.add_argument('--hourly-days', type=int, default=HOURLY_RETENTION_DAYS,
+                              help="days of hourly buckets to keep before rolling them up into days")
+    prune_parser.add_argument('--daily-days', type=int, default=DAILY_RETENTION_DAYS, help="days of daily buckets to keep")
+    prune_parser.add_argument('--weeks', type=int, default=SKETCH_RETENTION_WEEKS, help="weeks of weekly sketches to keep")
+    parser.add_argument('--backend', choices=['sqlite', 'jsonl'], default='sqlite', help="analytics store to use")
+    args = parser.parse_args()
+    
+    if args.command == 'prune':
+        if args.backend != 'sqlite':
+            parser.error("only the sqlite backend has a retention policy")
+        store = SQLiteStore(hourly_retention_days=args.hourly_days, daily_retention_days=args.daily_days,
+                            sketch_retention_weeks=args.weeks)
+        store.downsample()
+        print(f"Pruned: hourly buckets > {args.hourly_days} days rolled up, "
+              f"daily buckets > {args.daily_days} days and weekly sketches > {args.weeks} weeks removed")
+        sys.exit(0)
+    
+    store = open_store(args.backend)
+    
+    if args.command == 'compact':
+        before = database_size(store.path) if isinstance(store, SQLiteStore) else None
+        store.compact()
+        if before is not None:
+            print(f"Compacted {store.path}: {before / 1024:,.0f} KB -> {database_size(store.path) / 1024:,.0f} KB")
+        else:
+            print(f"Compacted {store.log_filename} into {store.filename}")
+        sys.exit(0)
+    
+    if args.command == 'export':
+        rows = export_buckets(store, args.output, args.since, args.until, args.resolution, args.format)
+        print(f"Wrote {rows:,} rows ({args.since} to {args.until}, by {args.resolution}) to {args.output}")
+        sys.exit(0)
+    
+    print_summary(store)
@@ -4,114 +4,14 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
-from data_loader import load_all_wage_data, get_industries
+from data_loader import load_all_wage_data, load_compiled_dataset, get_industries, WageIndex, OccupationSearch, SSOCIndex
+from analytics import BufferedAnalytics, SessionTracker, week_key
 import io
 import json
-import os
-from datetime import datetime
+import uuid
+from datetime import datetime, timedelta
 from collections import Counter
 
-# Simple analytics tracking system
-class SimpleAnalytics:
-    def __init__(self, filename="analytics_data.json"):
-        self.filename = filename
-        self.data = self.load_data()
-        
-    def load_data(self):
-        """Load existing analytics data or create new."""
-        if os.path.exists(self.filename):
-            try:
-                with open(self.filename, 'r') as f:
-                    return json.load(f)
-            except:
-                pass
-        return {"total_pageviews": 0, "counts": {}, "search_history": []}
-    
-    def save_data(self):
-        """Save analytics data to file."""
-        try:
-            with open(self.filename, 'w') as f:
-                json.dump(self.data, f, indent=2)
-        except:
-            pass
-    
-    def track_pageview(self):
-        """Track a page view."""
-        self.data["total_pageviews"] = self.data.get("total_pageviews", 0) + 1
-        self.save_data()
-    
-    def track_widget(self, widget_name, value=None):
-        """Track widget interaction."""
-        key = widget_name
-        if value is not None:
-            key = f"{widget_name} - {value}"
-        self.data["counts"][key] = self.data["counts"].get(key, 0) + 1
-        self.save_data()
-    
-    def track_search(self, search_type, search_value):
-        """Track a search with timestamp."""
-        if not search_value or search_value == "-- Select an occupation --":
-            return
-        
-        search_entry = {
-            "type": search_type,  # "occupation" or "industry"
-            "value": search_value,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        # Add to search history
-        if "search_history" not in self.data:
-            self.data["search_history"] = []
-        
-        self.data["search_history"].append(search_entry)
-        
-        # Keep only last 20 searches
-        self.data["search_history"] = self.data["search_history"][-20:]
-        
-        self.save_data()
-    
-    def get_recent_searches(self, limit=10):
-        """Get recent searches with relative timestamps."""
-        try:
-            searches = self.data.get("search_history", [])
-            
-            # Filter out invalid searches and add relative time formatting
-            valid_searches = []
-            for search in searches:
-                try:
-                    # Ensure search has required fields
-                    if not all(key in search for key in ["type", "value", "timestamp"]):
-                        continue
-                    
-                    # Skip empty or placeholder values
-                    if not search["value"] or search["value"] == "-- Select an occupation --":
-                        continue
-                    
-                    timestamp = datetime.fromisoformat(search["timestamp"])
-                    now = datetime.now()
-                    diff = now - timestamp
-                    
-                    if diff.total_seconds() < 60:
-                        search["relative_time"] = "Just now"
-                    elif diff.total_seconds() < 3600:
-                        minutes = int(diff.total_seconds() / 60)
-                        search["relative_time"] = f"{minutes}m ago"
-                    elif diff.total_seconds() < 86400:
-                        hours = int(diff.total_seconds() / 3600)
-                        search["relative_time"] = f"{hours}h ago"
-                    else:
-                        days = int(diff.total_seconds() / 86400)
-                        search["relative_time"] = f"{days}d ago"
-                    
-                    valid_searches.append(search)
-                except:
-                    # Skip invalid search entries
-                    continue
-            
-            return valid_searches[-limit:][::-1]  # Return last N searches, newest first
-        except:
-            return []  # Return empty list if any error occurs
-
 # Configure page
 st.set_page_config(
     page_title="Singapore Wage Insights - Salary Trends & Analysis (2021-2024)",
@@ -496,44 +396,93 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Column names used throughout the app
+COLUMN_RENAMES = {
+    'Basic_P25': 'P25_Basic',
+    'Basic_Median': 'Median_Basic',
+    'Basic_P75': 'P75_Basic',
+    'Gross_P25': 'P25_Gross',
+    'Gross_Median': 'Median_Gross',
+    'Gross_P75': 'P75_Gross'
+}
+
+@st.cache_resource
+def load_dataset():
+    """Load the artifact compiled by `python data_loader.py build` once per process.
+    
+    Returns None when it is missing or stale; the loaders below then build
+    what they need from the workbooks (or the snapshot cache) instead.
+    """
+    return load_compiled_dataset()
+
 @st.cache_data
 def load_data():
     """Load and prepare wage data with caching."""
-    df = load_all_wage_data()
+    dataset = load_dataset()
+    df = dataset['frame'] if dataset is not None else load_all_wage_data()
     
     # Rename columns to match requirements
-    df = df.rename(columns={
-        'Basic_P25': 'P25_Basic',
-        'Basic_Median': 'Median_Basic',
-        'Basic_P75': 'P75_Basic',
-        'Gross_P25': 'P25_Gross',
-        'Gross_Median': 'Median_Gross',
-        'Gross_P75': 'P75_Gross'
-    })
+    df = df.rename(columns=COLUMN_RENAMES)
     
     return df
 
+@st.cache_resource
+def load_wage_index():
+    """Load the (occupation, industry) lookup index once per process.
+    
+    Uses the compiled artifact when it is current, so the first request
+    does not parse or index anything.
+    """
+    dataset = load_dataset()
+    if dataset is not None:
+        return dataset['index'].rename(COLUMN_RENAMES)
+    return WageIndex(load_data())
+
+@st.cache_resource
+def load_ssoc_index():
+    """Load the SSOC group index and its median rollups once per process."""
+    dataset = load_dataset()
+    # Built from the original wage column names, like the compiled one
+    ssoc_index = dataset['ssoc'] if dataset is not None else SSOCIndex(load_all_wage_data())
+    return ssoc_index.rename(COLUMN_RENAMES)
+
+@st.cache_resource
+def load_occupation_search():
+    """Load the occupation search index once per process."""
+    dataset = load_dataset()
+    if dataset is not None:
+        return dataset['search']
+    return OccupationSearch(get_unique_occupations(load_data()))
+
+# Seconds the rendered recent-search feed is reused before it is rebuilt
+RECENT_FEED_TTL = 5
+
+# Widget count rows per page in the dashboard's raw data view
+RAW_DATA_PAGE_SIZE = 50
+
+@st.cache_resource
+def get_analytics():
+    """Analytics service shared by every session in this process.
+
+    Tracking calls only queue events; a background thread writes them to
+    the analytics database in batches.
+    """
+    return BufferedAnalytics()
+
 @st.cache_data
 def get_unique_occupations(df):
     """Get sorted list of unique occupations."""
     return sorted(df['Occupation'].unique())
 
 def filter_occupations(df, search_term):
-    """Filter occupations based on search term."""
+    """Filter occupations based on search term, best matches first.
+    
+    Falls back to typo-tolerant matching when no title contains the term.
+    """
     if not search_term:
         return get_unique_occupations(df)
     
-    occupations = get_unique_occupations(df)
-    search_lower = search_term.lower()
-    
-    # Filter occupations that contain the search term
-    filtered = [occ for occ in occupations if search_lower in occ.lower()]
-    
-    # Sort by relevance (starts with search term first)
-    starts_with = [occ for occ in filtered if occ.lower().startswith(search_lower)]
-    contains = [occ for occ in filtered if not occ.lower().startswith(search_lower)]
-    
-    return starts_with + contains
+    return load_occupation_search().match(search_term)
 
 def calculate_yoy_growth(df):
     """Calculate year-over-year growth rates."""
@@ -655,49 +604,95 @@ def show_analytics_dashboard():
     st.title("📊 Singapore Wage App Analytics Dashboard")
     st.markdown("---")
     
-    # Check for analytics data file
-    if not os.path.exists("analytics_data.json"):
+    # Aggregates are computed by the analytics store rather than in Python
+    analytics = get_analytics()
+    analytics.flush()
+    store = analytics.store
+    if store.is_empty():
         st.warning("No analytics data available yet. Start using the app to generate data.")
         return
-    
-    # Load analytics data
-    try:
-        with open("analytics_data.json", "r") as f:
-            analytics_data = json.load(f)
-    except Exception as e:
-        st.error(f"Error loading analytics data: {e}")
-        return
+    summary = store.summary()
     
     # Overview metrics
-    col1, col2, col3, col4 = st.columns(4)
+    col1, col2, col3, col4, col5 = st.columns(5)
     
-    # Calculate total interactions
-    total_interactions = sum(analytics_data.get("counts", {}).values())
+    total_interactions = summary["total_interactions"]
     
     with col1:
-        st.metric("Total Page Views", analytics_data.get("total_pageviews", 0))
+        st.metric("Total Page Views", summary["total_pageviews"])
     with col2:
         st.metric("Total Interactions", total_interactions)
     with col3:
-        st.metric("Unique Widgets Used", len(analytics_data.get("counts", {})))
+        st.metric("Unique Widgets Used", summary["unique_widgets"])
     with col4:
         # Calculate average interactions per session
-        avg_interactions = total_interactions / max(analytics_data.get("total_pageviews", 1), 1)
+        avg_interactions = total_interactions / max(summary["total_pageviews"], 1)
         st.metric("Avg Interactions/Session", f"{avg_interactions:.1f}")
+    with col5:
+        # HyperLogLog estimates, roughly 1.6% error
+        unique_sessions = store.distinct_sessions()
+        week_sessions = store.distinct_sessions(week_key())
+        st.metric(
+            "Unique Sessions (est.)",
+            "n/a" if unique_sessions is None else f"{unique_sessions:,}",
+            # The event-log backend keeps no per-week sketch
+            help=None if week_sessions is None else f"This week: {week_sessions:,}"
+        )
+    
+    st.markdown("---")
+    
+    # Activity over time from the hourly/daily buckets
+    st.subheader("📅 Activity Trends")
+    period = st.radio(
+        "Period",
+        options=["Last 48 hours", "Last 30 days", "Last 12 months"],
+        index=1,
+        horizontal=True
+    )
+    if period == "Last 48 hours":
+        trend = store.trend("hour", datetime.now() - timedelta(hours=48))
+    elif period == "Last 30 days":
+        trend = store.trend("day", datetime.now() - timedelta(days=30))
+    else:
+        trend = store.trend("day", datetime.now() - timedelta(days=365))
+    
+    if trend:
+        trend_df = pd.DataFrame(trend, columns=['Period', 'Page Views', 'Interactions'])
+        trend_df = trend_df.melt(id_vars='Period', var_name='Metric', value_name='Count')
+        fig_trend = px.line(
+            trend_df,
+            x='Period',
+            y='Count',
+            color='Metric',
+            markers=True,
+            title=f"Page Views and Interactions ({period})"
+        )
+        st.plotly_chart(fig_trend, use_container_width=True)
+    else:
+        st.info("No activity recorded in this period.")
     
     st.markdown("---")
     
+    # Occupation and industry popularity come from top-K sketches, all time or this week
+    popularity_window = st.radio(
+        "Popularity window",
+        options=["All time", "This week"],
+        index=0,
+        horizontal=True
+    )
+    popularity_week = week_key() if popularity_window == "This week" else None
+    
     # Create two columns for charts
     col_left, col_right = st.columns(2)
     
     with col_left:
         # Widget usage statistics
         st.subheader("📈 Widget Usage Statistics")
-        counts = analytics_data.get("counts", {})
-        if counts:
+        top_widgets = store.top_counts(15)
+        if top_widgets:
             # Process widget data
-            widget_df = pd.DataFrame(list(counts.items()), columns=['Widget', 'Count'])
-            widget_df = widget_df.sort_values('Count', ascending=True).tail(15)
+            widget_df = pd.DataFrame(top_widgets, columns=['Widget', 'Count'])
+            widget_df = widget_df.sort_values('Count', ascending=True)
             
             # Create horizontal bar chart
             fig_widgets = px.bar(
@@ -718,29 +713,17 @@ def show_analytics_dashboard():
         # Occupation selection analysis
         st.subheader("🔍 Popular Occupations")
         
-        # Extract occupation selections from widget data
-        occupation_data = {}
-        for widget, count in counts.items():
-            if "Choose an occupation" in widget or "Choose up to 3 occupations" in widget:
-                # Try to extract occupation name from widget string
-                if " - " in widget:
-                    parts = widget.split(" - ")
-                    if len(parts) > 1:
-                        occupation = parts[1].strip()
-                        if occupation and occupation != "-- Select an occupation --":
-                            occupation_data[occupation] = occupation_data.get(occupation, 0) + count
+        top_occupations = store.top_searches("occupation", 10, week=popularity_week)
         
-        if occupation_data:
-            # Get top 10 occupations
-            top_occupations = dict(sorted(occupation_data.items(), key=lambda x: x[1], reverse=True)[:10])
-            occ_df = pd.DataFrame(list(top_occupations.items()), columns=['Occupation', 'Selections'])
+        if top_occupations:
+            occ_df = pd.DataFrame(top_occupations, columns=['Occupation', 'Selections'])
             
             # Create pie chart
             fig_occ = px.pie(
                 occ_df, 
                 values='Selections', 
                 names='Occupation',
-                title="Top 10 Selected Occupations"
+                title=f"Top 10 Selected Occupations ({popularity_window})"
             )
             fig_occ.update_traces(textposition='inside', textinfo='percent+label')
             fig_occ.update_layout(height=600)
@@ -756,24 +739,14 @@ def show_analytics_dashboard():
     with col_insights1:
         st.subheader("💡 Feature Usage Insights")
         
-        # Analyze feature usage
-        comparison_mode_count = 0
-        basic_wage_count = 0
-        gross_wage_count = 0
-        csv_downloads = 0
-        png_downloads = 0
-        
-        for widget, count in counts.items():
-            if "Enable Comparison Mode" in widget:
-                comparison_mode_count += count
-            elif "Select Wage Type - Basic" in widget:
-                basic_wage_count += count
-            elif "Select Wage Type - Gross" in widget:
-                gross_wage_count += count
-            elif "Download Data as CSV" in widget:
-                csv_downloads += count
-            elif "Download Chart as PNG" in widget:
-                png_downloads += count
+        # Feature usage from the aggregates kept at write time
+        comparison_mode_count = dict(store.aggregate("feature", 10)).get("Comparison Mode", 0)
+        wage_types = dict(store.aggregate("wage_type", 10))
+        basic_wage_count = wage_types.get("Basic", 0)
+        gross_wage_count = wage_types.get("Gross", 0)
+        downloads = dict(store.aggregate("download", 10))
+        csv_downloads = downloads.get("CSV Data", 0)
+        png_downloads = downloads.get("PNG Chart", 0)
         
         # Display insights
         st.metric("Comparison Mode Used", comparison_mode_count)
@@ -817,24 +790,16 @@ def show_analytics_dashboard():
         
         # Industry selection analysis
         st.subheader("🏢 Popular Industries")
-        industry_data = {}
-        for widget, count in counts.items():
-            if "Select Industry" in widget and " - " in widget:
-                parts = widget.split(" - ")
-                if len(parts) > 1:
-                    industry = parts[1].strip()
-                    if industry:
-                        industry_data[industry] = industry_data.get(industry, 0) + count
+        top_industries = store.top_searches("industry", 5, week=popularity_week)
         
-        if industry_data:
-            top_industries = dict(sorted(industry_data.items(), key=lambda x: x[1], reverse=True)[:5])
-            ind_df = pd.DataFrame(list(top_industries.items()), columns=['Industry', 'Selections'])
+        if top_industries:
+            ind_df = pd.DataFrame(top_industries, columns=['Industry', 'Selections'])
             
             fig_ind = px.bar(
                 ind_df,
                 x='Industry',
                 y='Selections',
-                title="Top 5 Selected Industries",
+                title=f"Top 5 Selected Industries ({popularity_window})",
                 color='Selections',
                 color_continuous_scale='Viridis'
             )
@@ -845,24 +810,57 @@ def show_analytics_dashboard():
     
     # Raw data view
     with st.expander("📋 View Raw Analytics Data"):
-        st.json(analytics_data)
-        
-        # Download analytics data
-        analytics_json = json.dumps(analytics_data, indent=2)
-        st.download_button(
-            label="Download Analytics Data (JSON)",
-            data=analytics_json,
-            file_name=f"wage_app_analytics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-            mime="application/json"
+        # Summary plus one page of widget counts; the full data is in the download
+        st.json(summary)
+        pages = max(1, -(-summary["unique_widgets"] // RAW_DATA_PAGE_SIZE))
+        page = st.number_input(f"Widget counts page (of {pages})", min_value=1, max_value=pages, value=1)
+        widget_rows = store.widget_page((page - 1) * RAW_DATA_PAGE_SIZE, RAW_DATA_PAGE_SIZE)
+        st.dataframe(
+            pd.DataFrame(widget_rows, columns=['Widget', 'Value', 'Count']),
+            use_container_width=True,
+            hide_index=True
         )
+        st.caption("Export time ranges with `python analytics.py export`; see `python analytics.py --help`.")
+        
+        # The full export is only built on request, then kept for this session's download
+        if st.button("Prepare Analytics Data (JSON)"):
+            st.session_state["analytics_export"] = (
+                datetime.now().strftime('%Y%m%d_%H%M%S'),
+                json.dumps(store.export(), indent=2)
+            )
+        prepared = st.session_state.get("analytics_export")
+        if prepared:
+            prepared_at, analytics_json = prepared
+            st.download_button(
+                label="Download Analytics Data (JSON)",
+                data=analytics_json,
+                file_name=f"wage_app_analytics_{prepared_at}.json",
+                mime="application/json"
+            )
+
+@st.cache_data(ttl=RECENT_FEED_TTL, show_spinner=False)
+def render_recent_searches():
+    """Markdown for the recent occupation and industry columns.
+    
+    Rebuilt from the analytics ring buffers at most every RECENT_FEED_TTL
+    seconds; every rerun in between reuses the cached snippet.
+    """
+    feed = get_analytics().recent_feed(10)
+    snippets = []
+    for search_type, heading in [("occupation", "**👨‍💼 Recent Occupations**"), ("industry", "**🏢 Recent Industries**")]:
+        lines = []
+        for value in feed.get(search_type, []):
+            display_text = value[:50] + ('...' if len(value) > 50 else '')
+            lines.append(f"• {display_text}")
+        snippets.append(heading + "\n\n" + "  \n".join(lines) if lines else "")
+    return snippets
 
 def show_recent_searches():
     """Display recent searches section."""
     try:
-        analytics = SimpleAnalytics()
-        recent_searches = analytics.get_recent_searches(20)  # Get 20 to have enough for 10+10
+        occupation_snippet, industry_snippet = render_recent_searches()
         
-        if not recent_searches:
+        if not occupation_snippet and not industry_snippet:
             return
     except:
         # If there's any error loading recent searches, silently skip this section
@@ -874,31 +872,22 @@ def show_recent_searches():
     
     # Create a container for the searches
     with st.container():
-        # Group searches by type for better display
-        occupation_searches = [s for s in recent_searches if s["type"] == "occupation"]
-        industry_searches = [s for s in recent_searches if s["type"] == "industry"]
-        
         col1, col2 = st.columns(2)
         
         with col1:
-            if occupation_searches:
-                st.markdown("**👨‍💼 Recent Occupations**")
-                for idx, search in enumerate(occupation_searches[:10]):  # Show top 10
-                    display_text = search['value'][:50] + ('...' if len(search['value']) > 50 else '')
-                    st.markdown(f"• {display_text}")
+            if occupation_snippet:
+                st.markdown(occupation_snippet)
         
         with col2:
-            if industry_searches:
-                st.markdown("**🏢 Recent Industries**")
-                for idx, search in enumerate(industry_searches[:10]):  # Show top 10
-                    display_text = search['value'][:50] + ('...' if len(search['value']) > 50 else '')
-                    st.markdown(f"• {display_text}")
+            if industry_snippet:
+                st.markdown(industry_snippet)
     
     st.markdown("---")
 
 def main():
-    # Initialize analytics
-    analytics = SimpleAnalytics()
+    # Initialize analytics; the tracker skips widget values already recorded this session
+    analytics = get_analytics()
+    tracker = SessionTracker(analytics, st.session_state)
     
     # Check for admin parameter
     query_params = st.query_params
@@ -917,7 +906,7 @@ def main():
     
     # Track page view
     if 'page_viewed' not in st.session_state:
-        analytics.track_pageview()
+        analytics.track_pageview(st.session_state.setdefault("session_id", uuid.uuid4().hex))
         st.session_state.page_viewed = True
     
     # SEO-optimized header with proper heading hierarchy
@@ -931,7 +920,8 @@ def main():
     
     # Load data
     with st.spinner("Loading wage data..."):
-        df = load_data()
+        wage_index = load_wage_index()
+        df = wage_index.df
     
     # Show recent searches section
     show_recent_searches()
@@ -939,21 +929,46 @@ def main():
     # Occupation selection
     st.sidebar.subheader("Select Occupation")
     
-    # Single select with search
-    occupations = ["-- Select an occupation --"] + get_unique_occupations(df)
+    # Optionally narrow the list to one SSOC major group
+    ssoc_index = load_ssoc_index()
+    major_groups = ssoc_index.groups()
+    selected_group = st.sidebar.selectbox(
+        "SSOC major group",
+        options=[''] + major_groups,
+        format_func=lambda code: ssoc_index.label(code) if code else "All groups",
+        index=0
+    )
+    
+    # Ranked, typo-tolerant search narrows the list further
+    search_term = st.sidebar.text_input(
+        "Search occupations",
+        placeholder="e.g. sofware developer",
+        help="Best matches first; close spellings are matched too"
+    ).strip()
     
+    # Single select with search
+    group_occupations = ssoc_index.occupations_under(selected_group) if selected_group else get_unique_occupations(df)
+    if search_term:
+        in_group = set(group_occupations)
+        group_occupations = [occupation for occupation in filter_occupations(df, search_term) if occupation in in_group]
+    occupations = ["-- Select an occupation --"] + group_occupations
+    
+    # Changing the options recreates the selectbox, so carry the last choice
+    # over when it is still listed (the placeholder otherwise)
+    previous_occupation = st.session_state.get("selected_occupation")
     selected_occupation = st.sidebar.selectbox(
         "Choose an occupation",
         options=occupations,
-        index=0,  # Start with placeholder selected
+        index=occupations.index(previous_occupation) if previous_occupation in occupations else 0,
         help="Type to search for occupations"
     )
+    st.session_state["selected_occupation"] = selected_occupation
     # Only proceed if actual occupation selected (not placeholder)
     selected_occupations = [selected_occupation] if selected_occupation and selected_occupation != "-- Select an occupation --" else []
     
-    # Track occupation selections
-    for occupation in selected_occupations:
-        if occupation and occupation != "-- Select an occupation --":
+    # Track occupation selections (the placeholder is remembered but not recorded)
+    if tracker.changed("Choose an occupation", selected_occupation):
+        for occupation in selected_occupations:
             analytics.track_widget("Choose an occupation", occupation)
             analytics.track_search("occupation", occupation)
     
@@ -964,8 +979,7 @@ def main():
         options=industries,
         index=0
     )
-    analytics.track_widget("Select Industry", selected_industry)
-    analytics.track_search("industry", selected_industry)
+    tracker.track_widget("Select Industry", selected_industry, search_type="industry")
     
     # Wage type toggle
     wage_type = st.sidebar.radio(
@@ -973,12 +987,12 @@ def main():
         options=['Basic', 'Gross'],
         index=0
     )
-    analytics.track_widget("Select Wage Type", wage_type)
+    tracker.track_widget("Select Wage Type", wage_type)
     
     # Filter data for selected occupation(s) and industry
     data_list = []
     for occupation in selected_occupations:
-        filtered_df = df[(df['Occupation'] == occupation) & (df['Industry'] == selected_industry)]
+        filtered_df = wage_index.lookup(occupation, selected_industry)
         if not filtered_df.empty:
             data_list.append((occupation, filtered_df))
     
@@ -1034,6 +1048,20 @@ def main():
                         f"Median ({latest_year})",
                         f"${median:,.0f}"
                     )
+                
+                # Compare against the occupation's SSOC minor group
+                minor_group = str(latest_data['SSOC_Code'].iloc[0])[:3]
+                group_df = ssoc_index.rollup(minor_group, selected_industry)
+                group_latest = group_df[group_df['Year'] == latest_year]
+                if pd.notna(median) and not group_latest.empty:
+                    group_median = group_latest[f'Median{wage_suffix}'].iloc[0]
+                    if pd.notna(group_median):
+                        st.metric(
+                            f"SSOC {minor_group} Group Median",
+                            f"${group_median:,.0f}",
+                            delta=f"{median - group_median:+,.0f} vs group",
+                            help=f"Median of the reported {wage_type.lower()} medians among the {group_latest['Occupations'].iloc[0]} occupations in SSOC minor group {minor_group}"
+                        )
     
     # Year-over-year growth section
     st.markdown("## 📈 Year-over-Year Salary Growth Rates")
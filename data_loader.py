@@ -1,7 +1,22 @@
 import pandas as pd
+import numpy as np
 import os
-from typing import Dict, List, Tuple
+import sys
+import re
+import json
+import time
+import hashlib
+import tempfile
+import pickle
+import threading
+import argparse
+import bisect
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
 import warnings
+import pyarrow.feather as feather
+from openpyxl import load_workbook
 
 warnings.filterwarnings('ignore', category=UserWarning, module='openpyxl')
 
@@ -24,150 +39,1347 @@ INDUSTRY_MAPPING = {
     'T4.14': 'Other Community, Social and Personal Services'
 }
 
-def load_excel_file(filepath: str) -> Dict[str, pd.DataFrame]:
-    """Load all sheets from an Excel file."""
-    xl = pd.ExcelFile(filepath)
-    sheets = {}
+# Reverse lookup from industry name to sheet name
+SHEET_NAMES = {industry: sheet for sheet, industry in INDUSTRY_MAPPING.items()}
+
+# Location of the columnar snapshot written by load_all_wage_data
+CACHE_DIR = os.environ.get('WAGE_CACHE_DIR', '.wage_cache')
+SNAPSHOT_FILE = 'wage_snapshot.arrow'
+INGEST_MANIFEST = 'ingest_manifest.json'
+COMPILED_DATASET = 'wage_dataset.pkl'
+
+# Format versions: SNAPSHOT_VERSION covers the Arrow snapshot's frame layout,
+# DATASET_VERSION the indexes pickled into the compiled artifact. The artifact
+# embeds the frame, so it is rebuilt when either changes; the snapshot only
+# when its own version does.
+SNAPSHOT_VERSION = 3
+DATASET_VERSION = 8
+
+# Survey year embedded in a workbook filename, e.g. "2025 monthly basic ..."
+YEAR_PATTERN = re.compile(r'(?<!\d)(?:19|20)\d{2}(?!\d)')
+
+# Only the row number, SSOC code, occupation and six wage columns are used
+SHEET_COLUMNS = 9
+
+def _convert_cell(value):
+    """Normalise a raw openpyxl value the way pd.read_excel does."""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and value == '':
+        return None
+    return value
+
+def iter_workbook_sheets(filepath: str, sheet_names: Optional[List[str]] = None) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """Yield (sheet_name, frame) for each T4.* sheet from a single workbook handle.
     
-    for sheet_name in xl.sheet_names:
-        if sheet_name.startswith('T4'):
+    The workbook is opened once in openpyxl's read-only (streaming) mode and
+    only the first SHEET_COLUMNS columns of each sheet are materialised.
+    Passing sheet_names restricts the output to those sheets.
+    """
+    wb = load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        for sheet_name in wb.sheetnames:
+            if not sheet_name.startswith('T4'):
+                continue
+            if sheet_names is not None and sheet_name not in sheet_names:
+                continue
             try:
-                df = pd.read_excel(filepath, sheet_name=sheet_name, header=None)
-                sheets[sheet_name] = df
+                ws = wb[sheet_name]
+                rows = []
+                for row in ws.iter_rows(max_col=SHEET_COLUMNS, values_only=True):
+                    row = [_convert_cell(v) for v in row]
+                    row.extend([None] * (SHEET_COLUMNS - len(row)))
+                    rows.append(row)
+                # Drop trailing blank rows, as pd.read_excel does
+                while rows and all(v is None for v in rows[-1]):
+                    rows.pop()
+                yield sheet_name, pd.DataFrame(rows, columns=range(SHEET_COLUMNS))
             except Exception as e:
                 print(f"Error reading sheet {sheet_name}: {e}")
+    finally:
+        wb.close()
+
+def load_excel_file(filepath: str) -> Dict[str, pd.DataFrame]:
+    """Load all sheets from an Excel file."""
+    return dict(iter_workbook_sheets(filepath))
+
+# Column 2 text that marks a numbered row as a header rather than data
+HEADER_KEYWORDS = ('Occupation', 'MANAGERS')
+
+def detect_data_start(df: pd.DataFrame) -> Tuple[int, str]:
+    """Find the first data row and describe the rule that decided it.
+    
+    A data row has a numeric row number in column 0 and an occupation name
+    in column 2 that contains none of HEADER_KEYWORDS. Returns the row
+    position (-1 if there is none) and a short description of the matching
+    rule, or of the rule that failed, so layout changes are easy to spot.
+    """
+    if df.empty or df.shape[1] < 3:
+        return -1, "sheet has fewer than 3 columns"
+    
+    # Column 0 must hold a row number
+    row_number = df.iloc[:, 0].to_numpy(dtype=object)
+    is_numeric = pd.notna(pd.to_numeric(row_number, errors='coerce'))
+    if not is_numeric.any():
+        return -1, "no numeric row number in column 0"
+    
+    # Column 2 must hold an occupation name
+    name = df.iloc[:, 2]
+    candidates = is_numeric & name.notna().to_numpy()
+    if not candidates.any():
+        return -1, "no occupation name in column 2 next to a row number"
+    
+    # ...that is not a header
+    header_pattern = '|'.join(re.escape(keyword) for keyword in HEADER_KEYWORDS)
+    is_header = name.astype(str).str.contains(header_pattern, na=False).to_numpy()
     
-    return sheets
+    hits = np.flatnonzero(candidates & ~is_header)
+    if len(hits) == 0:
+        return -1, f"every numbered row is a header ({', '.join(HEADER_KEYWORDS)})"
+    
+    start = int(hits[0])
+    skipped = int((candidates & is_header)[:start].sum())
+    if skipped:
+        return start, f"first numbered row after {skipped} header row(s) ({', '.join(HEADER_KEYWORDS)})"
+    return start, "first numbered row with an occupation name"
 
 def find_data_start_row(df: pd.DataFrame) -> int:
     """Find the row where actual data starts (after headers)."""
-    for idx, row in df.iterrows():
-        # Look for the first row with a numeric value in column 0 (row number)
-        # and valid occupation data in column 2
-        if pd.notna(row.iloc[0]) and pd.notna(row.iloc[2]):
-            try:
-                # Check if first column is numeric (row number)
-                float(row.iloc[0])
-                # Check if it's not a header row
-                if 'Occupation' not in str(row.iloc[2]) and 'MANAGERS' not in str(row.iloc[2]):
-                    return idx
-            except:
-                continue
-    return -1
+    return detect_data_start(df)[0]
+
+# Output wage columns and the sheet column each one is read from
+WAGE_COLUMNS = {
+    'Basic_P25': 3,
+    'Basic_Median': 4,
+    'Basic_P75': 5,
+    'Gross_P25': 6,
+    'Gross_Median': 7,
+    'Gross_P75': 8
+}
+
+# Label columns stored as categoricals in the compact layout
+CATEGORICAL_COLUMNS = ['Industry', 'SSOC_Code', 'Occupation']
+
+def clean_wage_column(values: np.ndarray) -> np.ndarray:
+    """Clean a column of wage values: 's' (suppressed) and other non-numbers become NaN."""
+    return pd.to_numeric(values, errors='coerce').astype('float64')
 
-def clean_wage_value(value):
-    """Clean wage values, converting 's' (suppressed) to None."""
-    if pd.isna(value) or value == 's' or str(value).strip() == 's':
+def process_sheet(df: pd.DataFrame, year: int, industry: str, report: Optional[Dict] = None) -> pd.DataFrame:
+    """Process a single sheet and extract wage data.
+    
+    If report is given, the detected start row and matching rule are
+    recorded in it. A sheet without data rows gives an empty frame; its
+    rule explains why, and validate_dataset reports it.
+    """
+    # Find where data starts
+    data_start, rule = detect_data_start(df)
+    if report is not None:
+        report['start_row'] = data_start
+        report['rule'] = rule
+    if data_start == -1:
+        return pd.DataFrame()
+    
+    body = df.iloc[data_start:, :SHEET_COLUMNS]
+    
+    # Skip rows with no occupation name
+    occupation = body.iloc[:, 2]
+    has_name = occupation.notna().to_numpy()
+    occupation = occupation[has_name].astype(str).str.strip()
+    
+    # Skip section headers (e.g., "MANAGERS", "PROFESSIONALS")
+    is_data = ~(occupation.str.isupper() & (occupation.str.split().str.len() <= 3)).to_numpy()
+    if not is_data.any():
+        return pd.DataFrame()
+    
+    values = body.to_numpy(dtype=object)[has_name][is_data]
+    ssoc = pd.Series(values[:, 1], dtype=object)
+    
+    # Build the frame column by column
+    data = {
+        'Year': year,
+        'Industry': industry,
+        'SSOC_Code': ssoc.astype(str).where(ssoc.notna(), '').to_numpy(),
+        'Occupation': occupation.to_numpy()[is_data]
+    }
+    for column, position in WAGE_COLUMNS.items():
+        data[column] = clean_wage_column(values[:, position])
+    
+    return pd.DataFrame(data)
+
+def find_wage_files(data_dir: str = '.') -> List[str]:
+    """Return the wage workbooks in data_dir, sorted by filename."""
+    return sorted(
+        os.path.join(data_dir, f) for f in os.listdir(data_dir)
+        if f.endswith('.xlsx') and 'monthly basic and gross wages' in f
+    )
+
+def file_sha256(filepath: str) -> str:
+    """Hash a file's contents in chunks."""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def file_fingerprint(filepath: str) -> Dict:
+    """Fingerprint a workbook by size, mtime and content hash."""
+    stat = os.stat(filepath)
+    return {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': file_sha256(filepath)
+    }
+
+def fingerprint_matches(filepath: str, recorded: Dict) -> bool:
+    """Check a workbook against a recorded fingerprint.
+    
+    Size and mtime are compared first; the content hash is only computed
+    when the mtime moved (e.g. after a fresh git checkout), so an unchanged
+    tree is validated without reading any workbook.
+    """
+    try:
+        stat = os.stat(filepath)
+    except OSError:
+        return False
+    if stat.st_size != recorded.get('size'):
+        return False
+    if stat.st_mtime_ns == recorded.get('mtime_ns'):
+        return True
+    if file_sha256(filepath) != recorded.get('sha256'):
+        return False
+    recorded['mtime_ns'] = stat.st_mtime_ns
+    return True
+
+def write_json_atomic(path: str, data: Dict):
+    """Write JSON to path via a temporary file so readers never see a partial file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+def read_manifest(cache_dir: str = CACHE_DIR) -> Optional[Dict]:
+    """Read the ingest manifest, or None if it is missing or from another version."""
+    manifest_path = os.path.join(cache_dir, INGEST_MANIFEST)
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != SNAPSHOT_VERSION:
+        return None
+    return manifest
+
+def read_snapshot(cache_dir: str = CACHE_DIR) -> Optional[pd.DataFrame]:
+    """Memory-map the cached snapshot, or return None if there is none."""
+    snapshot_path = os.path.join(cache_dir, SNAPSHOT_FILE)
+    if not os.path.exists(snapshot_path):
         return None
     try:
-        return float(value)
-    except:
+        table = feather.read_table(snapshot_path, memory_map=True)
+    except Exception as e:
+        print(f"Error reading snapshot {snapshot_path}: {e}")
         return None
+    return table.to_pandas()
 
-def process_sheet(df: pd.DataFrame, year: int, industry: str) -> pd.DataFrame:
-    """Process a single sheet and extract wage data."""
-    # Find where data starts
-    data_start = find_data_start_row(df)
-    if data_start == -1:
+def save_snapshot(df: pd.DataFrame, manifest: Dict, cache_dir: str = CACHE_DIR):
+    """Write df as an uncompressed Arrow snapshot together with its ingest manifest."""
+    os.makedirs(cache_dir, exist_ok=True)
+    snapshot_path = os.path.join(cache_dir, SNAPSHOT_FILE)
+    
+    # Uncompressed Arrow IPC can be memory-mapped without a decode step
+    tmp_path = f"{snapshot_path}.tmp"
+    df.to_feather(tmp_path, compression='uncompressed')
+    os.replace(tmp_path, snapshot_path)
+    
+    manifest['version'] = SNAPSHOT_VERSION
+    manifest['updated'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    write_json_atomic(os.path.join(cache_dir, INGEST_MANIFEST), manifest)
+
+def year_from_filename(filepath: str) -> Optional[int]:
+    """Extract the survey year from a workbook filename."""
+    match = YEAR_PATTERN.search(os.path.basename(filepath))
+    return int(match.group(0)) if match else None
+
+def parse_workbook(filepath: str, year: int) -> Tuple[List[pd.DataFrame], Dict]:
+    """Parse every industry sheet of one workbook, in workbook order.
+    
+    Returns the per-sheet frames and an ingest report with the row count,
+    detected start row, matching rule and parse time of each sheet.
+    """
+    print(f"Loading data from {filepath}...")
+    start = time.perf_counter()
+    
+    # Process each sheet as it is streamed from the workbook
+    frames = []
+    sheets = {}
+    sheet_start = time.perf_counter()
+    for sheet_name, df in iter_workbook_sheets(filepath):
+        if sheet_name in INDUSTRY_MAPPING:
+            industry = INDUSTRY_MAPPING[sheet_name]
+            sheet_report = {'industry': industry}
+            sheet_data = process_sheet(df, year, industry, report=sheet_report)
+            if not sheet_data.empty:
+                frames.append(sheet_data)
+            sheet_report['rows'] = len(sheet_data)
+            sheet_report['seconds'] = round(time.perf_counter() - sheet_start, 4)
+            sheets[sheet_name] = sheet_report
+        sheet_start = time.perf_counter()
+    
+    report = {
+        'year': year,
+        'rows': sum(len(df) for df in frames),
+        'seconds': round(time.perf_counter() - start, 4),
+        'sheets': sheets
+    }
+    return frames, report
+
+def parse_single_sheet(filepath: str, sheet_name: str, year: int) -> Tuple[pd.DataFrame, Dict]:
+    """Parse one industry sheet of a workbook (unit of work for per-sheet parallelism)."""
+    start = time.perf_counter()
+    industry = INDUSTRY_MAPPING[sheet_name]
+    sheet_report = {'industry': industry}
+    sheet_data = pd.DataFrame()
+    for _, df in iter_workbook_sheets(filepath, sheet_names=[sheet_name]):
+        sheet_data = process_sheet(df, year, industry, report=sheet_report)
+    sheet_report['rows'] = len(sheet_data)
+    sheet_report['seconds'] = round(time.perf_counter() - start, 4)
+    return sheet_data, sheet_report
+
+def resolve_workers(workers: int) -> int:
+    """Turn a worker-count setting into a process count (<= 0 means all cores)."""
+    if workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+def compact_wage_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert a wage frame to the compact layout.
+    
+    Label columns become categoricals, Year becomes int16 and the wage
+    columns float32 (suppressed values stay NaN).
+    """
+    df = df.copy()
+    for column in CATEGORICAL_COLUMNS:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].cat.remove_unused_categories()
+        else:
+            df[column] = df[column].astype('category')
+    df['Year'] = df['Year'].astype('int16')
+    for column in WAGE_COLUMNS:
+        df[column] = df[column].astype('float32')
+    return df
+
+def expand_wage_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert a wage frame back to the original wide layout (strings, int64, float64)."""
+    df = df.copy()
+    for column in CATEGORICAL_COLUMNS:
+        df[column] = df[column].astype(str)
+    df['Year'] = df['Year'].astype('int64')
+    for column in WAGE_COLUMNS:
+        df[column] = df[column].astype('float64')
+    return df
+
+def memory_report(df: pd.DataFrame) -> pd.DataFrame:
+    """Compare per-column memory of the wide and compact layouts of df."""
+    wide = expand_wage_frame(df).memory_usage(deep=True, index=False)
+    compact = compact_wage_frame(df).memory_usage(deep=True, index=False)
+    report = pd.DataFrame({'wide_bytes': wide, 'compact_bytes': compact})
+    report.loc['Total'] = report.sum()
+    report['ratio'] = (report['wide_bytes'] / report['compact_bytes']).round(1)
+    return report
+
+def combine_frames(all_data: List[pd.DataFrame]) -> pd.DataFrame:
+    """Combine per-sheet frames into the final sorted, de-duplicated frame."""
+    if not all_data:
         return pd.DataFrame()
     
-    # Extract data rows
-    data_rows = []
+    combined_df = pd.concat(all_data, ignore_index=True)
     
-    for idx in range(data_start, len(df)):
-        row = df.iloc[idx]
-        
-        # Skip if no occupation name
-        if pd.isna(row.iloc[2]):
-            continue
-            
-        # Skip section headers (e.g., "MANAGERS", "PROFESSIONALS")
-        occupation = str(row.iloc[2]).strip()
-        if occupation.isupper() and len(occupation.split()) <= 3:
-            continue
-        
-        # Extract data
-        try:
-            data_rows.append({
-                'Year': year,
-                'Industry': industry,
-                'SSOC_Code': str(row.iloc[1]) if pd.notna(row.iloc[1]) else '',
-                'Occupation': occupation,
-                'Basic_P25': clean_wage_value(row.iloc[3]),
-                'Basic_Median': clean_wage_value(row.iloc[4]),
-                'Basic_P75': clean_wage_value(row.iloc[5]),
-                'Gross_P25': clean_wage_value(row.iloc[6]),
-                'Gross_Median': clean_wage_value(row.iloc[7]),
-                'Gross_P75': clean_wage_value(row.iloc[8])
-            })
-        except Exception as e:
-            continue
-    
-    return pd.DataFrame(data_rows)
-
-def load_all_wage_data() -> pd.DataFrame:
-    """Load and combine wage data from all Excel files."""
-    all_data = []
+    # Remove duplicates if any
+    combined_df = combined_df.drop_duplicates(subset=['Year', 'Industry', 'Occupation'])
     
-    # Get all Excel files in current directory
-    excel_files = [f for f in os.listdir('.') if f.endswith('.xlsx') and 'monthly basic and gross wages' in f]
+    # Sort by Year, Industry, Occupation
+    combined_df = combined_df.sort_values(['Year', 'Industry', 'Occupation'])
+    
+    return compact_wage_frame(combined_df.reset_index(drop=True))
+
+def parse_workbooks(excel_files: List[str], workers: int = 1,
+                    per_sheet: bool = False) -> Tuple[List[pd.DataFrame], Dict[str, Dict]]:
+    """Parse the given Excel files into per-sheet frames and per-file ingest reports.
     
+    With workers != 1 the workbooks are parsed in a process pool (one task per
+    workbook, or one per sheet when per_sheet is set). Results are collected
+    in the same file/sheet order as the serial path, so the combined frame is
+    identical either way. Files without a year in their name are skipped.
+    """
+    jobs = []
     for filepath in excel_files:
-        # Extract year from filename
-        year = None
-        for y in ['2021', '2022', '2023', '2024']:
-            if y in filepath:
-                year = int(y)
-                break
-        
-        if not year:
-            continue
-        
-        print(f"Loading data from {filepath}...")
-        sheets = load_excel_file(filepath)
-        
-        # Process each sheet
-        for sheet_name, df in sheets.items():
-            if sheet_name in INDUSTRY_MAPPING:
-                industry = INDUSTRY_MAPPING[sheet_name]
-                sheet_data = process_sheet(df, year, industry)
-                if not sheet_data.empty:
-                    all_data.append(sheet_data)
-    
-    # Combine all data
-    if all_data:
-        combined_df = pd.concat(all_data, ignore_index=True)
-        
-        # Remove duplicates if any
-        combined_df = combined_df.drop_duplicates(subset=['Year', 'Industry', 'Occupation'])
-        
-        # Sort by Year, Industry, Occupation
-        combined_df = combined_df.sort_values(['Year', 'Industry', 'Occupation'])
-        
-        return combined_df
+        year = year_from_filename(filepath)
+        if year:
+            jobs.append((filepath, year))
+    
+    workers = resolve_workers(workers)
+    all_data = []
+    reports = {}
+    
+    if workers == 1 or not jobs:
+        for filepath, year in jobs:
+            frames, reports[os.path.basename(filepath)] = parse_workbook(filepath, year)
+            all_data.extend(frames)
+    elif per_sheet:
+        tasks = []
+        for filepath, year in jobs:
+            wb = load_workbook(filepath, read_only=True)
+            sheet_names = wb.sheetnames
+            wb.close()
+            reports[os.path.basename(filepath)] = {'year': year, 'rows': 0, 'seconds': 0.0, 'sheets': {}}
+            for sheet_name in sheet_names:
+                if sheet_name in INDUSTRY_MAPPING:
+                    tasks.append((filepath, sheet_name, year))
+        if tasks:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = pool.map(parse_single_sheet, *zip(*tasks))
+                for (filepath, sheet_name, _), (df, sheet_report) in zip(tasks, results):
+                    report = reports[os.path.basename(filepath)]
+                    report['sheets'][sheet_name] = sheet_report
+                    report['rows'] += len(df)
+                    report['seconds'] = round(report['seconds'] + sheet_report['seconds'], 4)
+                    if not df.empty:
+                        all_data.append(df)
     else:
-        return pd.DataFrame()
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            for (filepath, _), (frames, report) in zip(jobs, pool.map(parse_workbook, *zip(*jobs))):
+                reports[os.path.basename(filepath)] = report
+                all_data.extend(frames)
+    
+    return all_data, reports
+
+def parse_wage_files(excel_files: List[str], workers: int = 1, per_sheet: bool = False) -> pd.DataFrame:
+    """Parse and combine wage data from the given Excel files."""
+    all_data, _ = parse_workbooks(excel_files, workers=workers, per_sheet=per_sheet)
+    return combine_frames(all_data)
+
+def load_all_wage_data(use_cache: bool = True, cache_dir: str = CACHE_DIR,
+                       workers: int = 1, per_sheet: bool = False) -> pd.DataFrame:
+    """Load and combine wage data from all Excel files.
+    
+    When use_cache is set, the columnar snapshot in cache_dir is updated
+    incrementally: workbooks that still match their fingerprint in the ingest
+    manifest are served from the snapshot, and only new or changed workbooks
+    are parsed and merged in (rows of removed workbooks are dropped). workers
+    and per_sheet control parallel parsing (see parse_workbooks).
+    """
+    # Get all Excel files in current directory
+    excel_files = [f for f in find_wage_files('.') if year_from_filename(f)]
+    
+    if not use_cache:
+        return parse_wage_files(excel_files, workers=workers, per_sheet=per_sheet)
+    
+    manifest = read_manifest(cache_dir)
+    cached_df = read_snapshot(cache_dir) if manifest else None
+    recorded = manifest.get('files', {}) if cached_df is not None else {}
+    before = json.dumps(recorded, sort_keys=True)
+    
+    current = {os.path.basename(f): f for f in excel_files}
+    removed = [name for name in recorded if name not in current]
+    stale = [f for name, f in current.items()
+             if name not in recorded or not fingerprint_matches(f, recorded[name])]
+    
+    if cached_df is not None and not stale and not removed:
+        # Remember refreshed mtimes so the next load skips hashing again
+        if json.dumps(recorded, sort_keys=True) != before:
+            try:
+                write_json_atomic(os.path.join(cache_dir, INGEST_MANIFEST), manifest)
+            except OSError:
+                pass
+        return cached_df
+    
+    # Rows are attributed to workbooks by year, so every workbook sharing a
+    # year with a changed or removed one is parsed again as well
+    stale_years = {recorded[name]['year'] for name in removed}
+    stale_years |= {year_from_filename(f) for f in stale}
+    stale_years |= {recorded[os.path.basename(f)]['year'] for f in stale if os.path.basename(f) in recorded}
+    stale = [f for f in excel_files if f in stale or year_from_filename(f) in stale_years]
+    
+    frames = []
+    if cached_df is not None:
+        kept = cached_df[~cached_df['Year'].isin(stale_years)]
+        if not kept.empty:
+            frames.append(kept)
+    
+    print(f"Reusing {len(current) - len(stale)} cached workbook(s), parsing {len(stale)}")
+    new_frames, reports = parse_workbooks(stale, workers=workers, per_sheet=per_sheet)
+    combined_df = combine_frames(frames + new_frames)
+    
+    files = {name: entry for name, entry in recorded.items() if name in current and current[name] not in stale}
+    ingested = time.strftime('%Y-%m-%dT%H:%M:%S')
+    for filepath in stale:
+        name = os.path.basename(filepath)
+        files[name] = {**file_fingerprint(filepath), 'ingested': ingested, **reports[name]}
+    
+    if not combined_df.empty:
+        try:
+            save_snapshot(combined_df, {'files': dict(sorted(files.items()))}, cache_dir)
+        except OSError as e:
+            print(f"Could not write snapshot to {cache_dir}: {e}")
+    
+    return combined_df
 
 def get_unique_occupations(df: pd.DataFrame) -> List[str]:
     """Get sorted list of unique occupations."""
+    if isinstance(df, LazyWageData):
+        return df.get_unique_occupations()
     return sorted(df['Occupation'].unique())
 
+def get_ssoc_codes(df: pd.DataFrame) -> Dict[str, str]:
+    """Map each occupation to its SSOC code in the latest year it appears."""
+    if isinstance(df, LazyWageData):
+        df = df.load_industry('All Industries')
+    latest = df.sort_values('Year', kind='stable').drop_duplicates('Occupation', keep='last')
+    return {str(occupation): str(code) for occupation, code in zip(latest['Occupation'], latest['SSOC_Code'])}
+
 def get_industries() -> List[str]:
     """Get list of all industries."""
     return list(INDUSTRY_MAPPING.values())
 
-def filter_data(df: pd.DataFrame, occupation: str, industry: str) -> pd.DataFrame:
-    """Filter data for specific occupation and industry."""
+class WageIndex:
+    """Case-insensitive hash index from (occupation, industry) to row positions.
+    
+    Built once over a loaded wage frame; lookup() then answers a query with a
+    single dict access and an iloc take instead of scanning the frame. Row
+    positions are kept in one array grouped by key (in year order within a
+    key), so the index pickles and unpickles as a dict plus two arrays.
+    """
+    
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.slots: Dict[Tuple[str, str], int] = {}
+        self.order = np.empty(0, dtype=np.intp)
+        self.offsets = np.zeros(1, dtype=np.intp)
+        if df.empty:
+            return
+        
+        occupation_codes, occupations = pd.factorize(df['Occupation'].astype(str).str.lower())
+        industry_codes, industries = pd.factorize(df['Industry'].astype(str))
+        
+        # Sort rows by key, then year, and record where each key's run starts
+        self.order = np.lexsort((df['Year'].to_numpy(), industry_codes, occupation_codes))
+        sorted_occupations = occupation_codes[self.order]
+        sorted_industries = industry_codes[self.order]
+        starts = np.flatnonzero(np.concatenate((
+            [True],
+            (np.diff(sorted_occupations) != 0) | (np.diff(sorted_industries) != 0)
+        )))
+        self.offsets = np.append(starts, len(self.order))
+        occupations = occupations.tolist()
+        industries = industries.tolist()
+        self.slots = {
+            (occupations[o], industries[i]): slot
+            for slot, (o, i) in enumerate(zip(sorted_occupations[starts].tolist(),
+                                              sorted_industries[starts].tolist()))
+        }
+    
+    def __len__(self) -> int:
+        return len(self.slots)
+    
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        occupation, industry = key
+        return (occupation.lower(), industry) in self.slots
+    
+    def rename(self, columns: Dict[str, str]) -> 'WageIndex':
+        """Return an index over df.rename(columns=columns) that shares these positions."""
+        renamed = WageIndex.__new__(WageIndex)
+        renamed.__dict__.update(self.__dict__)
+        renamed.df = self.df.rename(columns=columns)
+        return renamed
+    
+    def lookup(self, occupation: str, industry: str) -> pd.DataFrame:
+        """Return the rows for an occupation (any case) in an industry, sorted by year."""
+        slot = self.slots.get((occupation.lower(), industry))
+        if slot is None:
+            return self.df.iloc[0:0]
+        return self.df.iloc[self.order[self.offsets[slot]:self.offsets[slot + 1]]]
+
+class WageCube:
+    """Dense wage array shaped [year, industry, occupation, metric].
+    
+    Label axes are dictionary-encoded: years, industries and occupations are
+    sorted lists, and the *_ids dicts map a label to its position.
+    Occupations are keyed case-insensitively, as in WageIndex, because some
+    titles change capitalisation between years; each year's own spelling and
+    SSOC code are kept for lookup(). Suppressed and missing values are NaN;
+    `present` marks which (year, industry, occupation) cells had a row in the
+    source frame, so lookup() reproduces filter_data exactly, and series()
+    returns a view into the array.
+    
+    Building a DataFrame costs more than WageIndex's contiguous slice, so
+    the front ends keep WageIndex for their frames; 'python data_loader.py
+    cube' compares the two.
+    """
+    
+    def __init__(self, df: pd.DataFrame):
+        self.metrics = list(WAGE_COLUMNS)
+        if df.empty:
+            # No rows, and possibly no columns (combine_frames([])): empty axes
+            self.years, self.industries, self.occupations, occupation_keys = [], [], [], []
+        else:
+            self.years = sorted(int(year) for year in df['Year'].unique())
+            self.industries = sorted(str(industry) for industry in df['Industry'].unique())
+            
+            # Occupations are keyed in lower case and labelled with their latest spelling
+            titles = df['Occupation'].astype(str).to_numpy(dtype=object)
+            keys = df['Occupation'].astype(str).str.lower().to_numpy(dtype=object)
+            by_year = np.argsort(df['Year'].to_numpy(), kind='stable')
+            latest = dict(zip(keys[by_year].tolist(), titles[by_year].tolist()))
+            occupation_keys = sorted(latest)
+            self.occupations = [latest[key] for key in occupation_keys]
+        self.year_ids = {year: i for i, year in enumerate(self.years)}
+        self.industry_ids = {industry: i for i, industry in enumerate(self.industries)}
+        self.occupation_ids = {key: i for i, key in enumerate(occupation_keys)}
+        
+        shape = (len(self.years), len(self.industries), len(self.occupations))
+        self.values = np.full(shape + (len(self.metrics),), np.nan, dtype=np.float32)
+        self.present = np.zeros(shape, dtype=bool)
+        self.titles = np.full(shape, '', dtype=object)
+        self.ssoc_codes = np.full((len(self.years), len(self.occupations)), '', dtype=object)
+        if df.empty:
+            return
+        
+        year_index = np.searchsorted(self.years, df['Year'].to_numpy())
+        industry_index = pd.Categorical(df['Industry'].astype(str), categories=self.industries).codes
+        occupation_index = pd.Categorical(keys, categories=occupation_keys).codes
+        self.values[year_index, industry_index, occupation_index] = df[self.metrics].to_numpy(dtype=np.float32)
+        self.present[year_index, industry_index, occupation_index] = True
+        self.titles[year_index, industry_index, occupation_index] = titles
+        self.ssoc_codes[year_index, occupation_index] = df['SSOC_Code'].astype(str).to_numpy()
+    
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + self.present.nbytes
+    
+    def position(self, occupation: str, industry: str) -> Optional[Tuple[int, int]]:
+        """(industry, occupation) positions for an occupation (any case), or None."""
+        o = self.occupation_ids.get(occupation.lower())
+        i = self.industry_ids.get(industry)
+        if o is None or i is None:
+            return None
+        return i, o
+    
+    def series(self, occupation: str, industry: str) -> Optional[np.ndarray]:
+        """View of one occupation's wages in an industry, shaped [year, metric]."""
+        position = self.position(occupation, industry)
+        if position is None:
+            return None
+        i, o = position
+        return self.values[:, i, o, :]
+    
+    def lookup(self, occupation: str, industry: str) -> pd.DataFrame:
+        """The rows filter_data would return, rebuilt from the cube, sorted by year."""
+        columns = ['Year', 'Industry', 'SSOC_Code', 'Occupation'] + self.metrics
+        series = self.series(occupation, industry)
+        if series is None:
+            return pd.DataFrame(columns=columns)
+        i, o = self.position(occupation, industry)
+        years = np.flatnonzero(self.present[:, i, o])
+        values = series[years]
+        data = {
+            'Year': np.asarray(self.years, dtype=np.int16)[years],
+            'Industry': [self.industries[i]] * len(years),
+            'SSOC_Code': self.ssoc_codes[years, o],
+            'Occupation': self.titles[years, i, o]
+        }
+        data.update((metric, values[:, m]) for m, metric in enumerate(self.metrics))
+        return pd.DataFrame(data, columns=columns)
+
+# SSOC code length at each level of the classification
+SSOC_LEVELS = {
+    1: 'Major group',
+    2: 'Sub-major group',
+    3: 'Minor group',
+    4: 'Unit group',
+    5: 'Occupation'
+}
+
+# SSOC 2020 major groups, for those without a section header row in the workbooks
+SSOC_MAJOR_GROUPS = {
+    '1': 'LEGISLATORS, SENIOR OFFICIALS AND MANAGERS',
+    '2': 'PROFESSIONALS',
+    '3': 'ASSOCIATE PROFESSIONALS AND TECHNICIANS',
+    '4': 'CLERICAL SUPPORT WORKERS',
+    '5': 'SERVICE AND SALES WORKERS',
+    '6': 'AGRICULTURAL AND FISHERY WORKERS',
+    '7': 'CRAFTSMEN AND RELATED TRADES WORKERS',
+    '8': 'PLANT AND MACHINE OPERATORS AND ASSEMBLERS',
+    '9': 'CLEANERS, LABOURERS AND RELATED WORKERS'
+}
+
+def ssoc_prefix(code: str) -> str:
+    """Normalise an SSOC group pattern such as '2xxx' or '25*' to its prefix."""
+    return str(code).strip().rstrip('xX*')
+
+class SSOCIndex:
+    """Hierarchical index over SSOC code prefixes with median rollups.
+    
+    Every prefix of every occupation's code (major group '2', sub-major
+    '25', minor '251', unit '2512') maps to the occupations beneath it and
+    to its child prefixes. Rollups hold the median of each wage column over
+    an SSOC group's occupations for every (group, industry, year), sorted so
+    each (group, industry) is a contiguous run; rollup() slices that run
+    via a dict lookup, as WageIndex does for occupations. The one-digit
+    section header rows of the workbooks only supply major group names.
+    """
+    
+    def __init__(self, df: pd.DataFrame):
+        codes = df['SSOC_Code'].astype(str).to_numpy()
+        occupations = df['Occupation'].astype(str).to_numpy()
+        
+        self.names: Dict[str, str] = {}
+        self.members: Dict[str, List[str]] = {}
+        self.children: Dict[str, List[str]] = {}
+        members: Dict[str, set] = {}
+        children: Dict[str, set] = {}
+        for code, occupation in set(zip(codes.tolist(), occupations.tolist())):
+            if len(code) == 1:
+                self.names[code] = occupation
+                continue
+            for length in range(1, len(code) + 1):
+                members.setdefault(code[:length], set()).add(occupation)
+                children.setdefault(code[:length - 1], set()).add(code[:length])
+        # Name occupation-level codes after their title in the latest year
+        latest = df.sort_values('Year', kind='stable').drop_duplicates('SSOC_Code', keep='last')
+        for code, occupation in zip(latest['SSOC_Code'].astype(str), latest['Occupation'].astype(str)):
+            self.names.setdefault(code, occupation)
+        for code, name in SSOC_MAJOR_GROUPS.items():
+            self.names.setdefault(code, name)
+        self.members = {prefix: sorted(titles) for prefix, titles in members.items()}
+        self.children = {prefix: sorted(codes) for prefix, codes in children.items()}
+        
+        # One copy of each occupation row per group above it, then a grouped median
+        occupation_rows = np.flatnonzero(np.char.str_len(codes.astype(str)) > 1)
+        rows = df.iloc[occupation_rows]
+        row_codes = codes[occupation_rows]
+        wage_columns = list(WAGE_COLUMNS)
+        parts = []
+        for length in range(1, max(SSOC_LEVELS)):
+            deeper = np.char.str_len(row_codes.astype(str)) >= length
+            part = rows.loc[deeper, ['Industry', 'Year', 'Occupation'] + wage_columns].copy()
+            part.insert(0, 'SSOC', [code[:length] for code in row_codes[deeper]])
+            part['Industry'] = part['Industry'].astype(str)
+            parts.append(part)
+        if parts:
+            stacked = pd.concat(parts, ignore_index=True)
+        else:
+            stacked = pd.DataFrame(columns=['SSOC', 'Industry', 'Year', 'Occupation'] + wage_columns)
+        grouped = stacked.groupby(['SSOC', 'Industry', 'Year'], sort=True)
+        rollups = grouped[wage_columns].median()
+        # Every occupation in the group, whether or not its wages are suppressed
+        rollups.insert(0, 'Occupations', grouped['Occupation'].nunique())
+        rollups = rollups.reset_index()
+        rollups.insert(1, 'Level', rollups['SSOC'].str.len().map(SSOC_LEVELS))
+        self.rollups = rollups
+        
+        keys = list(zip(rollups['SSOC'], rollups['Industry']))
+        starts = [i for i in range(len(keys)) if i == 0 or keys[i] != keys[i - 1]]
+        self.offsets = np.append(np.array(starts, dtype=np.intp), len(keys))
+        self.slots: Dict[Tuple[str, str], int] = {keys[start]: slot for slot, start in enumerate(starts)}
+    
+    def rename(self, columns: Dict[str, str]) -> 'SSOCIndex':
+        """Return an index whose rollups use renamed wage columns."""
+        renamed = SSOCIndex.__new__(SSOCIndex)
+        renamed.__dict__.update(self.__dict__)
+        renamed.rollups = self.rollups.rename(columns=columns)
+        return renamed
+    
+    def label(self, code: str) -> str:
+        """Code with its name where the workbooks give one, e.g. '2 MANAGERS'."""
+        prefix = ssoc_prefix(code)
+        name = self.names.get(prefix)
+        return f"{prefix} {name}" if name else prefix
+    
+    def occupations_under(self, code: str) -> List[str]:
+        """Occupations whose SSOC code starts with code ('2', '2xxx', '251')."""
+        return self.members.get(ssoc_prefix(code), [])
+    
+    def groups(self, code: str = '') -> List[str]:
+        """Child prefixes one level below code; the major groups for ''."""
+        return self.children.get(ssoc_prefix(code), [])
+    
+    def rollup(self, code: str, industry: str) -> pd.DataFrame:
+        """Median wages of a group's occupations in an industry, one row per year."""
+        slot = self.slots.get((ssoc_prefix(code), industry))
+        if slot is None:
+            return self.rollups.iloc[0:0]
+        return self.rollups.iloc[self.offsets[slot]:self.offsets[slot + 1]]
+
+# Fuzzy occupation matching: largest edit distance indexed, results returned
+# when no title contains the query, and the lowest score worth suggesting
+FUZZY_MAX_DISTANCE = 2
+FUZZY_LIMIT = 10
+FUZZY_MIN_SCORE = 0.4
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+def allowed_distance(token: str) -> int:
+    """Typos tolerated in a query word: none below 3 letters, two from 6."""
+    if len(token) < 3:
+        return 0
+    return 1 if len(token) < 6 else FUZZY_MAX_DISTANCE
+
+def deletes(token: str, distance: int) -> set:
+    """Every string reachable from token by removing up to distance characters."""
+    variants = {token}
+    frontier = {token}
+    for _ in range(distance):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))}
+        variants |= frontier
+    return variants
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance between a and b, or limit + 1 if it exceeds limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = None
+    row = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(row[j] + 1, current[j - 1] + 1, row[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous, row = row, current
+    return min(row[-1], limit + 1)
+
+class OccupationSearch:
+    """Ranked substring search over occupation titles.
+    
+    Lowercased titles are computed once. Posting lists map every 1-, 2- and
+    3-character gram to the titles containing it: queries of up to three
+    characters are answered by their posting list alone, longer ones by the
+    titles holding their two rarest trigrams, confirmed with a substring
+    check. Two sorted prefix tables, of the titles and of every title suffix
+    that starts a later word, find title-prefix and word-prefix matches with
+    a bisect. Results rank title prefixes first, then word prefixes, then any
+    other substring; ties keep the titles' sorted order.
+    
+    For typos, titles are also split into words with a SymSpell-style
+    dictionary from each word's deletion variants back to the word. A query
+    word finds its near misses by looking up its own deletion variants, and
+    titles are scored on how well they cover the query words in any order.
+    This word index is built on first use and left out of pickles, so
+    loading the compiled artifact does not pay for it.
+    """
+    
+    def __init__(self, occupations: List[str]):
+        self.titles = sorted(set(occupations))
+        self.lowered = [title.lower() for title in self.titles]
+        
+        # Prefix tables: (key, title id) sorted by key
+        title_starts = sorted((lowered, i) for i, lowered in enumerate(self.lowered))
+        word_starts = sorted(
+            (lowered[j:], i)
+            for i, lowered in enumerate(self.lowered)
+            for j in range(1, len(lowered))
+            if lowered[j - 1] in ' (' and lowered[j] not in ' ('
+        )
+        self.title_keys = [key for key, _ in title_starts]
+        self.title_ids = [i for _, i in title_starts]
+        self.word_keys = [key for key, _ in word_starts]
+        self.word_ids = [i for _, i in word_starts]
+        
+        postings: Dict[str, List[int]] = {}
+        for i, lowered in enumerate(self.lowered):
+            grams = {lowered[j:j + n] for n in (1, 2, 3) for j in range(len(lowered) - n + 1)}
+            for gram in grams:
+                postings.setdefault(gram, []).append(i)
+        self.postings = postings
+        self.word_index: Optional[Dict] = None
+    
+    def __getstate__(self) -> Dict:
+        # The fuzzy word index outweighs everything else; rebuild it on first use
+        state = self.__dict__.copy()
+        state['word_index'] = None
+        return state
+    
+    def __len__(self) -> int:
+        return len(self.titles)
+    
+    def fuzzy_index(self) -> Dict:
+        """Word index for fuzzy matching, built on first use."""
+        if self.word_index is None:
+            word_titles: Dict[str, List[int]] = {}
+            word_counts = []
+            for i, lowered in enumerate(self.lowered):
+                words = TOKEN_PATTERN.findall(lowered)
+                word_counts.append(len(words))
+                for word in dict.fromkeys(words):
+                    word_titles.setdefault(word, []).append(i)
+            variants: Dict[str, List[str]] = {}
+            for word in sorted(word_titles):
+                for variant in deletes(word, allowed_distance(word)):
+                    variants.setdefault(variant, []).append(word)
+            self.word_index = {
+                'words': sorted(word_titles),
+                'word_titles': word_titles,
+                'word_counts': word_counts,
+                'variants': variants
+            }
+        return self.word_index
+    
+    @property
+    def words(self) -> List[str]:
+        return self.fuzzy_index()['words']
+    
+    @property
+    def word_titles(self) -> Dict[str, List[int]]:
+        return self.fuzzy_index()['word_titles']
+    
+    @property
+    def word_counts(self) -> List[int]:
+        return self.fuzzy_index()['word_counts']
+    
+    @property
+    def variants(self) -> Dict[str, List[str]]:
+        return self.fuzzy_index()['variants']
+    
+    @staticmethod
+    def prefix_range(keys: List[str], ids: List[int], query: str) -> List[int]:
+        lo = bisect.bisect_left(keys, query)
+        hi = bisect.bisect_left(keys, query + '\uffff', lo)
+        return ids[lo:hi]
+    
+    def substring_matches(self, query: str) -> Iterator[int]:
+        """Ids of titles containing query (already lowercased), in title order."""
+        if len(query) <= 3:
+            yield from self.postings.get(query, [])
+            return
+        postings = sorted((self.postings.get(query[j:j + 3], []) for j in range(len(query) - 2)), key=len)
+        candidates = postings[0]
+        if len(postings) > 1 and candidates:
+            second = set(postings[1])
+            candidates = [i for i in candidates if i in second]
+        for i in candidates:
+            if query in self.lowered[i]:
+                yield i
+    
+    def search(self, query: str, limit: Optional[int] = None) -> List[str]:
+        """Titles containing query (any case), best matches first."""
+        query = query.lower()
+        if not query:
+            return self.titles[:limit]
+        
+        ranked = sorted(self.prefix_range(self.title_keys, self.title_ids, query))
+        seen = set(ranked)
+        ranked += sorted(set(self.prefix_range(self.word_keys, self.word_ids, query)) - seen)
+        if limit is None or len(ranked) < limit:
+            seen.update(ranked)
+            for i in self.substring_matches(query):
+                if i not in seen:
+                    ranked.append(i)
+                    if limit is not None and len(ranked) >= limit:
+                        break
+        return [self.titles[i] for i in ranked[:limit]]
+    
+    def similar_words(self, token: str) -> Dict[str, float]:
+        """Indexed words close to a query word, with a similarity in (0, 1]."""
+        similar = {}
+        limit = allowed_distance(token)
+        for variant in deletes(token, limit):
+            for word in self.variants.get(variant, []):
+                if word not in similar:
+                    distance = edit_distance(token, word, limit)
+                    if distance <= limit:
+                        similar[word] = 1.0 - distance / (len(token) + 1)
+        # Words the query word is the start of, e.g. while it is being typed
+        if len(token) >= 2:
+            lo = bisect.bisect_left(self.words, token)
+            hi = bisect.bisect_left(self.words, token + '\uffff', lo)
+            for word in self.words[lo:hi]:
+                similar[word] = max(similar.get(word, 0.0), 0.9)
+        return similar
+    
+    def fuzzy_search(self, query: str, limit: int = FUZZY_LIMIT) -> List[str]:
+        """Titles best covering the words of query, tolerating typos and word order.
+        
+        Each query word scores its closest word in a title; a title's score
+        is the mean over query words, plus a bonus when the title starts
+        with the first query word. Ties prefer titles with fewer words.
+        """
+        tokens = list(dict.fromkeys(TOKEN_PATTERN.findall(query.lower())))
+        if not tokens:
+            return []
+        
+        scores: Dict[int, List[float]] = {}
+        for position, token in enumerate(tokens):
+            for word, similarity in self.similar_words(token).items():
+                for i in self.word_titles[word]:
+                    best = scores.setdefault(i, [0.0] * len(tokens))
+                    if similarity > best[position]:
+                        best[position] = similarity
+        
+        first_words = self.similar_words(tokens[0])
+        ranked = []
+        for i, best in scores.items():
+            score = sum(best) / len(tokens)
+            if TOKEN_PATTERN.match(self.lowered[i]).group() in first_words:
+                score += 0.1
+            if score >= FUZZY_MIN_SCORE:
+                ranked.append((-score, self.word_counts[i], i))
+        return [self.titles[i] for _, _, i in heapq.nsmallest(limit, ranked)]
+    
+    def match(self, query: str, limit: Optional[int] = None) -> List[str]:
+        """Titles containing query, or the closest fuzzy matches if there are none."""
+        matches = self.search(query, limit)
+        if matches or not query.strip():
+            return matches
+        return self.fuzzy_search(query, limit or FUZZY_LIMIT)
+
+def filter_data(df: pd.DataFrame, occupation: str, industry: str,
+                index: Optional[WageIndex] = None) -> pd.DataFrame:
+    """Filter data for specific occupation and industry.
+    
+    If a WageIndex built over df is given, it answers the lookup directly.
+    df may also be a LazyWageData, which loads the industry on demand.
+    """
+    if isinstance(df, LazyWageData):
+        return df.filter_data(occupation, industry)
+    if index is not None:
+        return index.lookup(occupation, industry)
+    
     # Case-insensitive matching
     mask = (df['Occupation'].str.lower() == occupation.lower()) & \
            (df['Industry'] == industry)
     return df[mask].sort_values('Year')
 
-if __name__ == "__main__":
-    # Test the data loader
-    print("Loading wage data...")
+class LazyWageData:
+    """Wage data that is parsed one industry at a time, on first request.
+    
+    Asking for an industry parses just its sheet from every workbook (each
+    workbook is opened in streaming mode and only that sheet is read),
+    builds a WageIndex over the result and memoizes both. filter_data and
+    get_unique_occupations accept an instance in place of a frame.
+    """
+    
+    def __init__(self, data_dir: str = '.'):
+        self.workbooks = [(f, year_from_filename(f)) for f in find_wage_files(data_dir) if year_from_filename(f)]
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._indexes: Dict[str, WageIndex] = {}
+        self._lock = threading.Lock()
+    
+    @property
+    def years(self) -> List[int]:
+        return sorted({year for _, year in self.workbooks})
+    
+    @property
+    def loaded_industries(self) -> List[str]:
+        return list(self._frames)
+    
+    def load_industry(self, industry: str) -> pd.DataFrame:
+        """Return the frame for one industry across all years, parsing it on first use."""
+        with self._lock:
+            if industry not in self._frames:
+                sheet_name = SHEET_NAMES.get(industry)
+                frames = []
+                if sheet_name is not None:
+                    print(f"Loading {industry} from {len(self.workbooks)} workbook(s)...")
+                    for filepath, year in self.workbooks:
+                        sheet_data, _ = parse_single_sheet(filepath, sheet_name, year)
+                        if not sheet_data.empty:
+                            frames.append(sheet_data)
+                combined_df = combine_frames(frames)
+                self._frames[industry] = combined_df
+                self._indexes[industry] = WageIndex(combined_df)
+            return self._frames[industry]
+    
+    def filter_data(self, occupation: str, industry: str) -> pd.DataFrame:
+        """Filter data for specific occupation and industry."""
+        self.load_industry(industry)
+        return self._indexes[industry].lookup(occupation, industry)
+    
+    def get_unique_occupations(self, industries: Optional[List[str]] = None) -> List[str]:
+        """Sorted occupations of the given industries (default: All Industries plus any already loaded)."""
+        if industries is None:
+            industries = [INDUSTRY_MAPPING['T4']] + [i for i in self.loaded_industries if i != INDUSTRY_MAPPING['T4']]
+        occupations = set()
+        for industry in industries:
+            df = self.load_industry(industry)
+            if not df.empty:
+                occupations.update(df['Occupation'].unique())
+        return sorted(occupations)
+
+def validate_dataset(reports: Dict[str, Dict], df: pd.DataFrame) -> Tuple[List[str], List[str]]:
+    """Check parsed workbooks for problems; returns (errors, warnings)."""
+    errors = []
+    warnings_found = []
+    
+    if not reports:
+        errors.append("no wage workbooks found")
+        return errors, warnings_found
+    
+    years = {}
+    for name, report in sorted(reports.items()):
+        if report['year'] in years:
+            errors.append(f"{name}: year {report['year']} already provided by {years[report['year']]}")
+        years[report['year']] = name
+        
+        if report['rows'] == 0:
+            errors.append(f"{name}: no data rows in any sheet")
+        
+        missing = [sheet for sheet in INDUSTRY_MAPPING if sheet not in report['sheets']]
+        if missing:
+            warnings_found.append(f"{name}: missing sheets {', '.join(missing)}")
+        
+        for sheet_name, sheet in report['sheets'].items():
+            if sheet['rows'] == 0:
+                warnings_found.append(f"{name} {sheet_name}: no data rows ({sheet['rule']})")
+    
+    if not df.empty:
+        # Percentiles should be ordered within each wage type
+        for wage_type in ('Basic', 'Gross'):
+            p25, median, p75 = (df[f'{wage_type}_{p}'] for p in ('P25', 'Median', 'P75'))
+            unordered = ((p25 > median) | (median > p75)).groupby(df['Year'], observed=True).sum()
+            for year, count in unordered.items():
+                if count:
+                    warnings_found.append(f"{year}: {count} rows with {wage_type} P25 <= Median <= P75 violated")
+    
+    return errors, warnings_found
+
+def build_dataset(workers: int = 1, cache_dir: str = CACHE_DIR) -> int:
+    """Validate the workbooks and compile them into the dataset artifact.
+    
+    The artifact is a pickle of the compact frame, its WageIndex and
+    SSOCIndex, the sorted occupation list and its OccupationSearch,
+    keyed by the source workbooks' fingerprints.
+    The snapshot cache is refreshed as well. Returns a process exit code.
+    """
+    start = time.perf_counter()
+    excel_files = [f for f in find_wage_files('.') if year_from_filename(f)]
+    frames, reports = parse_workbooks(excel_files, workers=workers)
+    df = combine_frames(frames)
+    
+    errors, warnings_found = validate_dataset(reports, df)
+    for message in warnings_found:
+        print(f"WARNING: {message}")
+    for message in errors:
+        print(f"ERROR: {message}")
+    if errors:
+        print(f"Build failed with {len(errors)} error(s)")
+        return 1
+    
+    ingested = time.strftime('%Y-%m-%dT%H:%M:%S')
+    files = {}
+    for filepath in excel_files:
+        name = os.path.basename(filepath)
+        files[name] = {**file_fingerprint(filepath), 'ingested': ingested, **reports[name]}
+    save_snapshot(df, {'files': files}, cache_dir)
+    
+    dataset = {
+        'version': DATASET_VERSION,
+        'snapshot_version': SNAPSHOT_VERSION,
+        'built': ingested,
+        'sources': {name: {k: entry[k] for k in ('size', 'mtime_ns', 'sha256')} for name, entry in files.items()},
+        'frame': df,
+        'index': WageIndex(df),
+        'occupations': get_unique_occupations(df),
+        'search': OccupationSearch(get_unique_occupations(df)),
+        'ssoc': SSOCIndex(df)
+    }
+    dataset_path = os.path.join(cache_dir, COMPILED_DATASET)
+    tmp_path = f"{dataset_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(dataset, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, dataset_path)
+    build_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    load_compiled_dataset(cache_dir)
+    load_seconds = time.perf_counter() - start
+    
+    print(f"Compiled {len(df)} records from {len(files)} workbook(s) into {dataset_path}")
+    print(f"Build took {build_seconds:.1f} s; loading the artifact takes {load_seconds * 1000:.1f} ms")
+    return 0
+
+def load_compiled_dataset(cache_dir: str = CACHE_DIR) -> Optional[Dict]:
+    """Load the artifact written by build_dataset if it matches the current workbooks.
+    
+    Returns a dict with 'frame', 'index', 'occupations', 'search' and 'ssoc',
+    or None if the artifact is missing, from another version or built from
+    other workbooks.
+    """
+    dataset_path = os.path.join(cache_dir, COMPILED_DATASET)
+    try:
+        with open(dataset_path, 'rb') as f:
+            dataset = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+    
+    if dataset.get('version') != DATASET_VERSION or dataset.get('snapshot_version') != SNAPSHOT_VERSION:
+        return None
+    
+    sources = dataset['sources']
+    excel_files = [f for f in find_wage_files('.') if year_from_filename(f)]
+    if sorted(os.path.basename(f) for f in excel_files) != sorted(sources):
+        return None
+    for filepath in excel_files:
+        if not fingerprint_matches(filepath, sources[os.path.basename(filepath)]):
+            return None
+    
+    return dataset
+
+def benchmark_snapshot(repeat: int = 5, workers: int = 1, per_sheet: bool = False):
+    """Compare a cold Excel parse, an incremental update and a snapshot load."""
+    excel_files = [f for f in find_wage_files('.') if year_from_filename(f)]
+    
+    with tempfile.TemporaryDirectory() as cache_dir:
+        start = time.perf_counter()
+        df = load_all_wage_data(cache_dir=cache_dir)
+        parse_seconds = time.perf_counter() - start
+        
+        parallel_seconds = None
+        if resolve_workers(workers) > 1:
+            start = time.perf_counter()
+            parallel_df = parse_wage_files(excel_files, workers=workers, per_sheet=per_sheet)
+            parallel_seconds = time.perf_counter() - start
+            pd.testing.assert_frame_equal(df, parallel_df)
+        
+        # Forget the newest workbook so the next load has to ingest just that one
+        manifest = read_manifest(cache_dir)
+        del manifest['files'][os.path.basename(excel_files[-1])]
+        write_json_atomic(os.path.join(cache_dir, INGEST_MANIFEST), manifest)
+        start = time.perf_counter()
+        incremental_df = load_all_wage_data(cache_dir=cache_dir)
+        incremental_seconds = time.perf_counter() - start
+        pd.testing.assert_frame_equal(df, incremental_df)
+        
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            cached_df = load_all_wage_data(cache_dir=cache_dir)
+            timings.append(time.perf_counter() - start)
+        snapshot_seconds = min(timings)
+        pd.testing.assert_frame_equal(df, cached_df)
+    
+    print(f"\nRecords:             {len(df)}")
+    print(f"Cold Excel parse:    {parse_seconds * 1000:10.1f} ms ({len(excel_files)} workbooks)")
+    if parallel_seconds is not None:
+        mode = 'per sheet' if per_sheet else 'per workbook'
+        print(f"Parallel parse:      {parallel_seconds * 1000:10.1f} ms "
+              f"({resolve_workers(workers)} workers, {mode})")
+    print(f"Incremental ingest:  {incremental_seconds * 1000:10.1f} ms (1 new workbook)")
+    print(f"Snapshot load:       {snapshot_seconds * 1000:10.1f} ms (best of {repeat})")
+    print(f"Speedup:             {parse_seconds / snapshot_seconds:10.1f}x")
+
+def benchmark_cube(repeat: int = 5, samples: int = 200):
+    """Compare WageCube lookups with the filter_data paths."""
     df = load_all_wage_data()
+    
+    def best(func) -> float:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+    
+    index_seconds = best(lambda: WageIndex(df))
+    cube_seconds = best(lambda: WageCube(df))
+    index = WageIndex(df)
+    cube = WageCube(df)
+    
+    rng = np.random.default_rng(0)
+    keys = list(index.slots)
+    keys = [keys[k] for k in rng.choice(len(keys), size=min(samples, len(keys)), replace=False)]
+    for occupation, industry in keys:
+        expected = filter_data(df, occupation, industry).reset_index(drop=True)
+        actual = cube.lookup(occupation, industry)
+        np.testing.assert_array_equal(expected[cube.metrics].to_numpy(), actual[cube.metrics].to_numpy())
+        np.testing.assert_array_equal(expected['Year'].to_numpy(), actual['Year'].to_numpy())
+    
+    rows = [
+        ('filter_data (scan)', best(lambda: [filter_data(df, o, i) for o, i in keys])),
+        ('filter_data (WageIndex)', best(lambda: [filter_data(df, o, i, index=index) for o, i in keys])),
+        ('WageCube.lookup (frame)', best(lambda: [cube.lookup(o, i) for o, i in keys])),
+        ('WageCube.series (view)', best(lambda: [cube.series(o, i) for o, i in keys]))
+    ]
+    print(f"\nRecords:                  {len(df)}")
+    print(f"Cube shape:               {cube.values.shape} (year, industry, occupation, metric)")
+    print(f"Frame memory:             {df.memory_usage(deep=True).sum() / 1024:10.1f} KB")
+    print(f"Cube memory:              {cube.nbytes / 1024:10.1f} KB")
+    print(f"Build WageIndex:          {index_seconds * 1000:10.2f} ms")
+    print(f"Build WageCube:           {cube_seconds * 1000:10.2f} ms")
+    print(f"\nSingle-series lookup (mean of {len(keys)}, best of {repeat}):")
+    for label, seconds in rows:
+        print(f"  {label:<24}{seconds / len(keys) * 1e6:10.1f} us")
+
+
+def print_layout(excel_files: List[str]):
+    """Print where data starts in every sheet and which rule found it."""
+    for filepath in excel_files:
+        print(f"\n{os.path.basename(filepath)}")
+        for sheet_name, df in iter_workbook_sheets(filepath):
+            start, rule = detect_data_start(df)
+            print(f"  {sheet_name:<6} row {start:>4}  {rule}")
+
+def print_summary(df: pd.DataFrame):
+    """Print a short summary of the loaded data."""
     print(f"Loaded {len(df)} records")
     print(f"Years: {sorted(df['Year'].unique())}")
     print(f"Industries: {len(df['Industry'].unique())}")
-    print(f"Occupations: {len(df['Occupation'].unique())}")
\ No newline at end of file
+    print(f"Occupations: {len(df['Occupation'].unique())}")
+
+def shared_options(suppress_defaults: bool = False) -> argparse.ArgumentParser:
+    """Parent parser with the options the loader and every subcommand accept.
+    
+    Subcommands suppress the defaults, so `--workers 4 build` and
+    `build --workers 4` both parse workers as 4.
+    """
+    options = argparse.ArgumentParser(add_help=False,
+                                      argument_default=argparse.SUPPRESS if suppress_defaults else None)
+    options.add_argument('--no-cache', action='store_true', help="ignore and do not write the snapshot cache")
+    options.add_argument('--workers', type=int, default=argparse.SUPPRESS if suppress_defaults else 1,
+                         help="parse workbooks in a process pool of this size (0 = all cores)")
+    options.add_argument('--per-sheet', action='store_true', help="parallelise across sheets as well as workbooks")
+    return options
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Singapore wage data loader", parents=[shared_options()])
+    subparsers = parser.add_subparsers(dest='command')
+    subcommand_options = [shared_options(suppress_defaults=True)]
+    subparsers.add_parser('build', parents=subcommand_options,
+                          help="validate the workbooks and compile the dataset artifact")
+    subparsers.add_parser('bench', parents=subcommand_options,
+                          help="time a cold Excel parse against the snapshot cache")
+    subparsers.add_parser('layout', parents=subcommand_options,
+                          help="show the detected data start row of every sheet")
+    subparsers.add_parser('memory', parents=subcommand_options,
+                          help="compare memory of the wide and compact frame layouts")
+    subparsers.add_parser('cube', parents=subcommand_options, help="time WageCube lookups against filter_data")
+    args = parser.parse_args()
+    
+    if args.command == 'build':
+        # Run from the importable module so pickled classes resolve to data_loader.*
+        import data_loader
+        sys.exit(data_loader.build_dataset(workers=args.workers))
+    
+    if args.command == 'bench':
+        benchmark_snapshot(workers=args.workers, per_sheet=args.per_sheet)
+        sys.exit(0)
+    
+    if args.command == 'layout':
+        print_layout(find_wage_files('.'))
+        sys.exit(0)
+    
+    if args.command == 'cube':
+        benchmark_cube()
+        sys.exit(0)
+    
+    if args.command == 'memory':
+        report = memory_report(load_all_wage_data(use_cache=not args.no_cache))
+        print(report.to_string())
+        sys.exit(0)
+    
+    # Test the data loader
+    print("Loading wage data...")
+    df = load_all_wage_data(use_cache=not args.no_cache, workers=args.workers, per_sheet=args.per_sheet)
+    print_summary(df)
@@ -0,0 +1,295 @@
+"""Concurrent-session load test for app.py.
+
+Scripts N virtual sessions with Streamlit's AppTest (in-process, no network).
+Each session picks occupations, industries and wage types and requests
+downloads. The harness records per-rerun latency percentiles, peak RSS and
+lock waits on the analytics database, and writes a JSON report that can be
+compared with one from an earlier release.
+
+AppTest keeps the mocked runtime in global state, so reruns from different
+sessions are run one at a time. Script reruns are CPU-bound under the GIL,
+as they would be in one server process, so a session's latency is its
+service time plus the time queued behind other sessions' reruns; both are
+reported. Caches and the analytics service are shared as on the server.
+
+    python loadtest.py --sessions 20 --actions 15 --output report.json
+    python loadtest.py --sessions 20 --compare report.json
+    python loadtest.py --sessions 1 --actions 5 --no-artifact
+
+--no-artifact points the wage cache at an empty directory, so the app runs
+its fallback path without a compiled dataset, as a local `streamlit run`
+before `python data_loader.py build` or after a workbook changes would.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+# Actions a virtual session picks from, with relative weights
+ACTIONS = {"occupation": 4, "industry": 2, "wage_type": 2, "download_csv": 1}
+
+# Seconds between probes of the analytics database write lock
+LOCK_PROBE_INTERVAL = 0.05
+
+# AppTest runs must not overlap (see the module docstring)
+RUN_LOCK = threading.Lock()
+
+def percentiles(samples):
+    """Summary statistics of a list of latencies in milliseconds."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 2),
+        "p50": pick(0.50),
+        "p90": pick(0.90),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "max": round(ordered[-1], 2)
+    }
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+class LockProbe(threading.Thread):
+    """Measures how long a writer waits for the analytics database's write lock."""
+    
+    def __init__(self, path):
+        super().__init__(name="lock-probe", daemon=True)
+        self.path = path
+        self.waits = []
+        self.stopped = threading.Event()
+    
+    def run(self):
+        conn = None
+        while not self.stopped.wait(LOCK_PROBE_INTERVAL):
+            if conn is None:
+                if not os.path.exists(self.path):
+                    continue
+                conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            start = time.perf_counter()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("COMMIT")
+            except sqlite3.OperationalError:
+                continue
+            self.waits.append((time.perf_counter() - start) * 1000)
+        if conn is not None:
+            conn.close()
+
+def share_script_cache():
+    """Make every AppTest reuse one compiled copy of the script, as the server does.
+    
+    AppTest builds a fresh ScriptCache for each run, so each rerun would also
+    pay for parsing and compiling app.py, which the real server does once.
+    """
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+    
+    shared = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: shared
+
+def run_session(session_no, actions, seed, results):
+    """Drive one virtual session and append (action, latency ms, service ms, error) tuples to results."""
+    from streamlit.testing.v1 import AppTest
+    
+    rng = random.Random(seed + session_no)
+    
+    def timed(action, step):
+        queued = time.perf_counter()
+        error = None
+        with RUN_LOCK:
+            start = time.perf_counter()
+            try:
+                at = step()
+                if at.exception:
+                    error = at.exception[0].message
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            end = time.perf_counter()
+        results.append((action, (end - queued) * 1000, (end - start) * 1000, error))
+    
+    def selectbox(label):
+        return next(box for box in at.sidebar.selectbox if box.label == label)
+    
+    at = AppTest.from_file(APP_PATH, default_timeout=300)
+    timed("initial", at.run)
+    if not at.sidebar.selectbox:
+        return
+    occupations = selectbox("Choose an occupation").options[1:]
+    industries = selectbox("Select Industry").options
+    
+    # Sessions start by choosing an occupation, as real visitors must
+    timed("occupation", lambda: selectbox("Choose an occupation").select(rng.choice(occupations)).run())
+    for _ in range(actions):
+        action = rng.choices(list(ACTIONS), weights=list(ACTIONS.values()))[0]
+        if action == "occupation":
+            timed(action, lambda: selectbox("Choose an occupation").select(rng.choice(occupations)).run())
+        elif action == "industry":
+            timed(action, lambda: selectbox("Select Industry").select(rng.choice(industries)).run())
+        elif action == "wage_type":
+            timed(action, lambda: at.sidebar.radio[0].set_value(rng.choice(["Basic", "Gross"])).run())
+        elif action == "download_csv":
+            buttons = [b for b in at.button if "CSV" in b.label]
+            if buttons:
+                timed(action, lambda: buttons[0].click().run())
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(APP_PATH)).stdout.strip() or None
+    except OSError:
+        return None
+
+def run_load_test(sessions, actions, seed, analytics_db, artifact=True):
+    """Run the sessions concurrently and return the report dict."""
+    import streamlit
+    
+    share_script_cache()
+    probe = LockProbe(analytics_db)
+    probe.start()
+    results = []
+    threads = [
+        threading.Thread(target=run_session, args=(n, actions, seed, results), name=f"session-{n}")
+        for n in range(sessions)
+    ]
+    
+    print(f"Running {sessions} sessions x {actions} actions...")
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    
+    # Let the analytics service flush what the sessions queued
+    import analytics
+    time.sleep(analytics.FLUSH_INTERVAL + 1)
+    probe.stopped.set()
+    probe.join()
+    
+    reruns = [latency for action, latency, _, _ in results if action != "initial"]
+    service = [service for action, _, service, _ in results if action != "initial"]
+    by_action = {}
+    for action, latency, _, _ in results:
+        by_action.setdefault(action, []).append(latency)
+    errors = [f"{action}: {error}" for action, _, _, error in results if error]
+    
+    store = analytics.SQLiteStore(analytics_db)
+    summary = store.summary()
+    
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "streamlit": streamlit.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "sessions": sessions,
+            "actions_per_session": actions,
+            "seed": seed,
+            "artifact": artifact
+        },
+        "wall_seconds": round(wall, 2),
+        "reruns_per_second": round(len(reruns) / wall, 2) if wall else None,
+        "latency_ms": {
+            "reruns": percentiles(reruns),
+            "rerun_service": percentiles(service),
+            "by_action": {action: percentiles(samples) for action, samples in sorted(by_action.items())}
+        },
+        "peak_rss_mb": peak_rss_mb(),
+        "errors": {"count": len(errors), "first": errors[:5]},
+        "analytics": {
+            "lock_wait_ms": percentiles(probe.waits),
+            "pageviews_recorded": summary["total_pageviews"],
+            "interactions_recorded": summary["total_interactions"],
+            "database_kb": round(analytics.database_size(analytics_db) / 1024, 1)
+        }
+    }
+
+def print_report(report, baseline=None):
+    """Print the headline numbers, with the change from baseline if given."""
+    def metric(path, label, unit=""):
+        value = report
+        base = baseline
+        for key in path:
+            value = value.get(key, {}) if isinstance(value, dict) else None
+            base = base.get(key, {}) if isinstance(base, dict) else None
+        if not isinstance(value, (int, float)):
+            return
+        line = f"  {label:<28} {value:>10}{unit}"
+        if isinstance(base, (int, float)) and base:
+            line += f"   (was {base}{unit}, {(value - base) / base:+.0%})"
+        print(line)
+    
+    meta = report["meta"]
+    print(f"\nLoad test @ {meta['git_commit']}: {meta['sessions']} sessions x {meta['actions_per_session']} actions"
+          f"{'' if meta.get('artifact', True) else ' (no compiled artifact)'}")
+    metric(["wall_seconds"], "wall time", " s")
+    metric(["reruns_per_second"], "reruns/s")
+    for stat in ("p50", "p90", "p99", "max"):
+        metric(["latency_ms", "reruns", stat], f"rerun latency {stat}", " ms")
+    metric(["latency_ms", "rerun_service", "p50"], "rerun service time p50", " ms")
+    metric(["latency_ms", "rerun_service", "p99"], "rerun service time p99", " ms")
+    metric(["latency_ms", "by_action", "initial", "p50"], "initial load p50", " ms")
+    metric(["peak_rss_mb"], "peak RSS", " MB")
+    metric(["analytics", "lock_wait_ms", "p99"], "analytics lock wait p99", " ms")
+    metric(["analytics", "lock_wait_ms", "max"], "analytics lock wait max", " ms")
+    metric(["analytics", "pageviews_recorded"], "page views recorded")
+    metric(["errors", "count"], "errors")
+    for error in report["errors"]["first"]:
+        print(f"    {error}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for the Singapore wage app")
+    parser.add_argument('--sessions', type=int, default=10, help="number of concurrent virtual sessions")
+    parser.add_argument('--actions', type=int, default=10, help="scripted interactions per session")
+    parser.add_argument('--seed', type=int, default=0, help="seed for the sessions' choices")
+    parser.add_argument('--output', help="write the JSON report to this file")
+    parser.add_argument('--compare', help="earlier JSON report to compare against")
+    parser.add_argument('--no-artifact', action='store_true',
+                        help="run without the compiled dataset or snapshot cache (the app's fallback path)")
+    args = parser.parse_args()
+    
+    # Report paths are relative to the caller's directory, not the app's
+    output = os.path.abspath(args.output) if args.output else None
+    compare = os.path.abspath(args.compare) if args.compare else None
+    
+    # Keep the test's analytics out of the real database
+    workdir = tempfile.mkdtemp(prefix="wage_loadtest_")
+    analytics_db = os.path.join(workdir, "analytics.db")
+    os.environ["ANALYTICS_DB"] = analytics_db
+    if args.no_artifact:
+        os.environ["WAGE_CACHE_DIR"] = os.path.join(workdir, "wage_cache")
+    os.chdir(os.path.dirname(APP_PATH))
+    
+    report = run_load_test(args.sessions, args.actions, args.seed, analytics_db, artifact=not args.no_artifact)
+    baseline = None
+    if compare:
+        with open(compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {output}")
+    sys.exit(1 if report["errors"]["count"] else 0)
@@ -0,0 +1,198 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from analytics import EventLogStore, SessionTracker, SQLiteStore, week_key, widget_key
+
+NOW = datetime(2026, 3, 10, 12, 30)
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteStore(str(tmp_path / "analytics.db"), legacy_filename=None)
+
+def add_bucket(store, resolution, start, count, widget="wage_type", value="Gross"):
+    store.conn.execute(
+        "INSERT INTO buckets VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT(resolution, start, widget, value) DO UPDATE SET count = count + excluded.count",
+        (resolution, start, widget, value, count)
+    )
+
+def buckets(store, resolution):
+    return store.conn.execute(
+        "SELECT start, widget, value, count FROM buckets WHERE resolution = ? ORDER BY start, widget, value",
+        (resolution,)
+    ).fetchall()
+
+def hour(when):
+    return when.strftime("%Y-%m-%dT%H:00")
+
+def test_old_hourly_buckets_roll_up_into_days(store):
+    old = NOW - timedelta(days=9)
+    for offset, count in [(0, 2), (1, 3), (5, 4)]:
+        add_bucket(store, "hour", hour(old.replace(hour=offset)), count)
+    add_bucket(store, "hour", hour(old.replace(hour=1)), 7, value="Basic")
+    recent = hour(NOW - timedelta(days=2))
+    add_bucket(store, "hour", recent, 1)
+    
+    store.downsample(now=NOW)
+    
+    day = old.strftime("%Y-%m-%d")
+    assert buckets(store, "day") == [(day, "wage_type", "Basic", 7), (day, "wage_type", "Gross", 9)]
+    # Hours inside the retention window are left alone
+    assert buckets(store, "hour") == [(recent, "wage_type", "Gross", 1)]
+
+def test_rollup_adds_to_an_existing_day(store):
+    old = NOW - timedelta(days=8)
+    day = old.strftime("%Y-%m-%d")
+    add_bucket(store, "day", day, 10)
+    add_bucket(store, "hour", hour(old), 5)
+    
+    store.downsample(now=NOW)
+    
+    assert buckets(store, "day") == [(day, "wage_type", "Gross", 15)]
+    assert buckets(store, "hour") == []
+
+def test_downsampling_twice_does_not_count_twice(store):
+    old = NOW - timedelta(days=10)
+    add_bucket(store, "hour", hour(old), 5)
+    add_bucket(store, "hour", hour(old + timedelta(hours=1)), 6)
+    
+    store.downsample(now=NOW)
+    store.downsample(now=NOW)
+    
+    assert buckets(store, "day") == [(old.strftime("%Y-%m-%d"), "wage_type", "Gross", 11)]
+
+def test_rollup_keeps_the_trend_totals(store):
+    for days_ago in range(1, 20):
+        for offset in (0, 6, 18):
+            add_bucket(store, "hour", hour((NOW - timedelta(days=days_ago)).replace(hour=offset)), days_ago)
+    since = NOW - timedelta(days=30)
+    before = store.trend("day", since)
+    
+    store.downsample(now=NOW)
+    
+    assert store.trend("day", since) == before
+
+def test_expired_days_are_dropped(store):
+    expired = (NOW - timedelta(days=400)).strftime("%Y-%m-%d")
+    kept = (NOW - timedelta(days=300)).strftime("%Y-%m-%d")
+    add_bucket(store, "day", expired, 3)
+    add_bucket(store, "day", kept, 4)
+    
+    store.downsample(now=NOW)
+    
+    assert buckets(store, "day") == [(kept, "wage_type", "Gross", 4)]
+
+def test_expired_weekly_sketches_are_dropped(store):
+    names = {
+        "old": f"hll:{week_key(NOW - timedelta(weeks=20))}",
+        "recent": f"top:occupation:{week_key(NOW - timedelta(weeks=2))}",
+        "all": "hll:all",
+    }
+    store.conn.execute("DELETE FROM sketches")
+    store.conn.executemany("INSERT INTO sketches VALUES (?, ?)", [(name, b"") for name in names.values()])
+    
+    store.downsample(now=NOW)
+    
+    remaining = {row[0] for row in store.conn.execute("SELECT name FROM sketches")}
+    assert remaining == {names["recent"], names["all"]}
+
+@pytest.fixture
+def event_files(tmp_path):
+    return str(tmp_path / "analytics_data.json"), str(tmp_path / "analytics_events.jsonl")
+
+def record_events(store, n):
+    for i in range(n):
+        store.record_pageview()
+        store.increment("wage_type", "Gross" if i % 3 else "Basic")
+    store.add_search("occupation", "Chef", "2026-03-10T12:00:00")
+
+def test_event_log_is_replayed_on_load(event_files):
+    filename, log_filename = event_files
+    store = EventLogStore(filename, log_filename, compact_every=1000)
+    record_events(store, 6)
+    
+    reopened = EventLogStore(filename, log_filename)
+    
+    assert not os.path.exists(filename)
+    assert reopened.data == store.data
+    assert reopened.summary() == {"total_pageviews": 6, "total_interactions": 6, "unique_widgets": 2}
+    assert reopened.top_counts(1) == [(widget_key("wage_type", "Gross"), 4)]
+
+def test_compaction_folds_the_log_into_the_snapshot(event_files):
+    filename, log_filename = event_files
+    store = EventLogStore(filename, log_filename, compact_every=5)
+    record_events(store, 6)
+    
+    # 13 events: compacted at 5 and 10, three left in the log
+    with open(log_filename) as f:
+        assert len(f.readlines()) == 3
+    assert EventLogStore(filename, log_filename).data == store.data
+    
+    store.compact()
+    
+    # The folded log is removed; the next event starts a new one
+    assert not os.path.exists(log_filename)
+    with open(filename) as f:
+        assert json.load(f)["total_pageviews"] == 6
+    assert EventLogStore(filename, log_filename).data == store.data
+
+def test_compaction_keeps_other_sessions_events(event_files):
+    filename, log_filename = event_files
+    first = EventLogStore(filename, log_filename, compact_every=1000)
+    second = EventLogStore(filename, log_filename, compact_every=1000)
+    record_events(first, 3)
+    record_events(second, 4)
+    
+    first.compact()
+    
+    assert first.summary()["total_pageviews"] == 7
+    assert EventLogStore(filename, log_filename).summary()["total_pageviews"] == 7
+
+def test_torn_log_lines_are_skipped(event_files):
+    filename, log_filename = event_files
+    store = EventLogStore(filename, log_filename, compact_every=1000)
+    record_events(store, 2)
+    with open(log_filename, "a") as f:
+        f.write('{"event": "widget", "wid')
+    
+    assert EventLogStore(filename, log_filename).data == store.data
+
+class RecordingAnalytics:
+    """Stands in for the analytics service, remembering what it was sent."""
+    
+    def __init__(self):
+        self.widgets = []
+        self.searches = []
+    
+    def track_widget(self, widget_name, value):
+        self.widgets.append((widget_name, value))
+    
+    def track_search(self, search_type, value):
+        self.searches.append((search_type, value))
+
+def test_session_tracker_records_only_changes():
+    analytics, state = RecordingAnalytics(), {}
+    tracker = SessionTracker(analytics, state)
+    for industry in ["Manufacturing", "Manufacturing", "Construction", "Construction", "Manufacturing"]:
+        tracker.track_widget("industry_select", industry, search_type="industry")
+    
+    expected = [("industry_select", value) for value in ["Manufacturing", "Construction", "Manufacturing"]]
+    assert analytics.widgets == expected
+    assert analytics.searches == [("industry", value) for _, value in expected]
+
+def test_session_tracker_state_survives_reruns():
+    analytics, state = RecordingAnalytics(), {}
+    SessionTracker(analytics, state).track_widget("wage_type", "Gross")
+    # Streamlit builds a new tracker on every rerun with the same session state
+    rerun = SessionTracker(analytics, state)
+    rerun.track_widget("wage_type", "Gross")
+    rerun.track_widget("show_trends", False)
+    
+    assert analytics.widgets == [("wage_type", "Gross"), ("show_trends", False)]
+    assert analytics.searches == []
+    # Another session starts from its own state
+    SessionTracker(analytics, {}).track_widget("wage_type", "Gross")
+    assert analytics.widgets == [("wage_type", "Gross"), ("show_trends", False), ("wage_type", "Gross")]
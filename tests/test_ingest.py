@@ -0,0 +1,90 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import data_loader
+from data_loader import find_wage_files, load_all_wage_data, read_manifest, year_from_filename
+
+WORKBOOKS = {year_from_filename(path): path for path in find_wage_files(os.path.dirname(os.path.abspath(data_loader.__file__)))}
+
+pytestmark = [
+    pytest.mark.skipif(len(WORKBOOKS) < 3, reason="needs the shipped wage workbooks"),
+    # data_loader silences this openpyxl warning at import; pytest resets the filters per test
+    pytest.mark.filterwarnings("ignore:Cannot parse header or footer:UserWarning")
+]
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """An empty data directory, made current as load_all_wage_data expects."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+def add_workbook(workdir, year, as_year=None):
+    source = WORKBOOKS[year]
+    name = os.path.basename(source).replace(str(year), str(as_year or year), 1)
+    shutil.copyfile(source, workdir / name)
+    return workdir / name
+
+def full_parse():
+    return load_all_wage_data(use_cache=False)
+
+def test_new_workbook_is_parsed_alone_and_matches_a_full_parse(workdir, capsys):
+    years = sorted(WORKBOOKS)
+    cache = str(workdir / "cache")
+    for year in years[:-1]:
+        add_workbook(workdir, year)
+    load_all_wage_data(cache_dir=cache)
+    add_workbook(workdir, years[-1])
+    capsys.readouterr()
+    
+    incremental = load_all_wage_data(cache_dir=cache)
+    
+    assert f"Reusing {len(years) - 1} cached workbook(s), parsing 1" in capsys.readouterr().out
+    pd.testing.assert_frame_equal(incremental, full_parse())
+    assert sorted(entry['year'] for entry in read_manifest(cache)['files'].values()) == years
+
+def test_removed_workbook_rows_are_dropped(workdir):
+    years = sorted(WORKBOOKS)
+    cache = str(workdir / "cache")
+    paths = {year: add_workbook(workdir, year) for year in years}
+    load_all_wage_data(cache_dir=cache)
+    os.remove(paths[years[1]])
+    
+    incremental = load_all_wage_data(cache_dir=cache)
+    
+    assert years[1] not in set(incremental['Year'])
+    pd.testing.assert_frame_equal(incremental, full_parse())
+
+def test_changed_workbook_is_parsed_again(workdir, capsys):
+    years = sorted(WORKBOOKS)
+    cache = str(workdir / "cache")
+    for year in years[:2]:
+        add_workbook(workdir, year)
+    load_all_wage_data(cache_dir=cache)
+    # Same filename, different contents: the later year's workbook under the earlier name
+    add_workbook(workdir, years[2], as_year=years[1])
+    capsys.readouterr()
+    
+    incremental = load_all_wage_data(cache_dir=cache)
+    
+    assert "Reusing 1 cached workbook(s), parsing 1" in capsys.readouterr().out
+    pd.testing.assert_frame_equal(incremental, full_parse())
+
+def test_touched_workbook_is_not_parsed_again(workdir, capsys):
+    years = sorted(WORKBOOKS)
+    cache = str(workdir / "cache")
+    paths = [add_workbook(workdir, year) for year in years[:2]]
+    first = load_all_wage_data(cache_dir=cache)
+    stat = os.stat(paths[0])
+    os.utime(paths[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    capsys.readouterr()
+    
+    again = load_all_wage_data(cache_dir=cache)
+    
+    # Same content hash: served from the snapshot, and the new mtime is remembered
+    assert "parsing" not in capsys.readouterr().out
+    pd.testing.assert_frame_equal(again, first)
+    recorded = read_manifest(cache)['files'][os.path.basename(paths[0])]
+    assert recorded['mtime_ns'] == os.stat(paths[0]).st_mtime_ns
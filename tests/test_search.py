@@ -0,0 +1,122 @@
+import itertools
+import pickle
+import random
+
+import pytest
+
+from data_loader import OccupationSearch, allowed_distance, deletes, edit_distance
+
+TITLES = [
+    "Software developer",
+    "Software and applications manager",
+    "Web and mobile applications developer",
+    "Systems analyst",
+    "Accountant",
+    "Accounts associate professional",
+    "Administration manager",
+    "Assistant accountant",
+    "Civil engineer",
+    "Electrical engineer",
+    "Welder and flame cutter",
+    "Chef",
+]
+
+def osa_distance(a, b):
+    """Reference optimal string alignment distance over the full matrix."""
+    d = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i in range(len(a) + 1):
+        d[i][0] = i
+    for j in range(len(b) + 1):
+        d[0][j] = j
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            d[i][j] = min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+    return d[-1][-1]
+
+def typo(word, rng):
+    """word with one random deletion, insertion, substitution or transposition."""
+    letter = rng.choice("abcdefghijklmnopqrstuvwxyz")
+    if len(word) < 2:
+        return word + letter
+    i = rng.randrange(len(word))
+    kind = rng.choice(["delete", "insert", "substitute", "transpose"])
+    if kind == "delete":
+        return word[:i] + word[i + 1:]
+    if kind == "insert":
+        return word[:i] + letter + word[i:]
+    if kind == "substitute":
+        return word[:i] + letter + word[i + 1:]
+    if i == len(word) - 1:
+        i -= 1
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+@pytest.fixture(scope="module")
+def search():
+    return OccupationSearch(TITLES)
+
+def test_deletes_includes_every_shorter_variant():
+    assert deletes("abc", 1) == {"abc", "bc", "ac", "ab"}
+    assert deletes("abc", 2) == {"abc", "bc", "ac", "ab", "a", "b", "c"}
+    assert deletes("abc", 0) == {"abc"}
+
+@pytest.mark.parametrize("a, b, expected", [
+    ("teh", "the", 1),          # one transposition
+    ("ca", "abc", 3),           # OSA, unlike Damerau-Levenshtein (2), cannot edit a transposed pair again
+    ("kitten", "sitting", 3),
+    ("", "abc", 3),
+    ("engineer", "engineer", 0),
+])
+def test_edit_distance_is_osa(a, b, expected):
+    assert edit_distance(a, b, 5) == expected
+
+def test_edit_distance_matches_reference_up_to_limit():
+    rng = random.Random(0)
+    words = ["".join(rng.choice("abcde") for _ in range(rng.randint(0, 7))) for _ in range(300)]
+    for a, b in itertools.islice(itertools.combinations(words, 2), 5000):
+        for limit in (0, 1, 2):
+            assert edit_distance(a, b, limit) == min(osa_distance(a, b), limit + 1), (a, b, limit)
+
+def test_similar_words_finds_every_word_within_allowed_distance(search):
+    # The symmetric-delete lookup must agree with a brute-force scan of the vocabulary
+    rng = random.Random(1)
+    queries = {typo(typo(word, rng), rng) for word in search.words for _ in range(5)}
+    queries |= {typo(word, rng) for word in search.words for _ in range(5)}
+    for token in queries:
+        if not token:
+            continue
+        limit = allowed_distance(token)
+        expected = {word for word in search.words if osa_distance(token, word) <= limit}
+        found = set(search.similar_words(token))
+        assert expected <= found, token
+        for word in found - expected:
+            # Anything else is offered because the query is the start of it
+            assert word.startswith(token), (token, word)
+
+def test_search_ranks_title_prefixes_then_word_prefixes_then_substrings(search):
+    assert search.search("account") == ["Accountant", "Accounts associate professional", "Assistant accountant"]
+    assert search.search("engineer") == ["Civil engineer", "Electrical engineer"]
+    assert search.search("ware")[:1] == ["Software and applications manager"]
+
+def test_search_is_case_insensitive_and_limited(search):
+    assert search.search("SOFTWARE", limit=1) == ["Software and applications manager"]
+    assert search.search("") == sorted(TITLES)
+
+def test_search_agrees_with_a_substring_scan(search):
+    for query in ["a", "an", "ana", "eng", "and app", "developer", "x", "er and"]:
+        expected = {title for title in TITLES if query in title.lower()}
+        assert set(search.search(query)) == expected, query
+
+def test_match_falls_back_to_fuzzy_search(search):
+    assert search.match("sofware developer")[0] == "Software developer"
+    assert search.match("developer software")[0] == "Software developer"
+    assert search.match("enginer")[:2] == ["Civil engineer", "Electrical engineer"]
+    assert search.match("zzzzzz") == []
+
+def test_fuzzy_index_is_left_out_of_pickles(search):
+    search.match("sofware")
+    restored = pickle.loads(pickle.dumps(search))
+    assert restored.word_index is None
+    assert restored.match("sofware developer") == search.match("sofware developer")
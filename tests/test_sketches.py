@@ -0,0 +1,94 @@
+import random
+from collections import Counter
+
+import pytest
+
+from analytics import HyperLogLog, SpaceSaving
+
+def zipf_stream(length, vocabulary, seed):
+    """A skewed stream of item names, as searches for popular occupations are."""
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, vocabulary + 1)]
+    return [f"item-{i}" for i in rng.choices(range(vocabulary), weights=weights, k=length)]
+
+@pytest.mark.parametrize("capacity", [10, 50, 100])
+def test_space_saving_error_bounds(capacity):
+    stream = zipf_stream(20000, 2000, seed=capacity)
+    exact = Counter(stream)
+    sketch = SpaceSaving(capacity)
+    for item in stream:
+        sketch.add(item)
+    
+    total = len(stream)
+    assert len(sketch.counts) == capacity
+    # Every increment lands in some counter
+    assert sum(sketch.counts.values()) == total
+    for item, estimate in sketch.counts.items():
+        # Counts never underestimate, and overestimate by at most the recorded error <= N/k
+        assert exact[item] <= estimate <= exact[item] + sketch.errors[item]
+        assert sketch.errors[item] <= total / capacity
+    # Anything more frequent than N/k is tracked
+    for item, count in exact.items():
+        if count > total / capacity:
+            assert item in sketch.counts
+
+def test_space_saving_is_exact_below_capacity():
+    sketch = SpaceSaving(10)
+    for item, count in [("a", 5), ("b", 3), ("c", 1), ("a", 2)]:
+        sketch.add(item, count)
+    assert sketch.top(2) == [("a", 7), ("b", 3)]
+    assert all(error == 0 for error in sketch.errors.values())
+
+def test_space_saving_round_trips():
+    sketch = SpaceSaving(5)
+    for item in zipf_stream(500, 50, seed=0):
+        sketch.add(item)
+    restored = SpaceSaving.loads(sketch.dumps())
+    assert restored.capacity == 5
+    assert restored.counts == sketch.counts
+    assert restored.errors == sketch.errors
+
+@pytest.mark.parametrize("n", [1000, 10000, 100000])
+def test_hyperloglog_within_error_bound(n):
+    sketch = HyperLogLog()
+    for i in range(n):
+        sketch.add(f"session-{i}")
+    # Standard error is 1.04 / sqrt(2**12), about 1.6%; allow four of them
+    standard_error = 1.04 / len(sketch.registers) ** 0.5
+    assert abs(sketch.count() - n) <= 4 * standard_error * n
+
+def test_hyperloglog_small_counts_are_near_exact():
+    sketch = HyperLogLog()
+    for i in range(50):
+        sketch.add(f"session-{i}")
+    assert abs(sketch.count() - 50) <= 1
+    assert HyperLogLog().count() == 0
+
+def test_hyperloglog_ignores_duplicates():
+    sketch = HyperLogLog()
+    for _ in range(3):
+        for i in range(5000):
+            sketch.add(f"session-{i}")
+    once = HyperLogLog()
+    for i in range(5000):
+        once.add(f"session-{i}")
+    assert sketch.registers == once.registers
+
+def test_hyperloglog_merge_is_union():
+    left, right, both = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    for i in range(6000):
+        (left if i < 4000 else right).add(f"session-{i}")
+        both.add(f"session-{i}")
+    # Overlap: the right half also sees some of the left's items
+    for i in range(3000, 4000):
+        right.add(f"session-{i}")
+    left.merge(right)
+    assert left.registers == both.registers
+
+def test_hyperloglog_round_trips():
+    sketch = HyperLogLog()
+    for i in range(1000):
+        sketch.add(i)
+    restored = HyperLogLog.loads(sketch.dumps())
+    assert restored.precision == sketch.precision
+    assert restored.count() == sketch.count()
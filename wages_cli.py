@@ -1,12 +1,13 @@
 #!/usr/bin/env python3
 import sys
+import argparse
 import matplotlib.pyplot as plt
 from prompt_toolkit import prompt
-from prompt_toolkit.completion import FuzzyWordCompleter
+from prompt_toolkit.completion import Completer, Completion
 from prompt_toolkit.shortcuts import radiolist_dialog
 from tabulate import tabulate
 import pandas as pd
-from data_loader import load_all_wage_data, get_unique_occupations, get_industries, filter_data
+from data_loader import load_all_wage_data, get_unique_occupations, get_ssoc_codes, get_industries, filter_data, WageIndex, LazyWageData, OccupationSearch, SSOCIndex, TOKEN_PATTERN
 
 # Configure matplotlib for better display
 plt.style.use('seaborn-v0_8-darkgrid')
@@ -42,6 +43,23 @@ def display_wage_data(data: pd.DataFrame, occupation: str, industry: str):
     
     print(tabulate(table_data, headers=headers, tablefmt='grid'))
 
+def show_ssoc_group(ssoc_index: SSOCIndex, code: str, industry: str):
+    """Print an SSOC group's subgroups, occupations and median wages by year."""
+    occupations = ssoc_index.occupations_under(code)
+    if not occupations:
+        print(f"No occupations found under SSOC '{code}'.")
+        return
+    
+    subgroups = ssoc_index.groups(code)
+    if subgroups:
+        print(f"\nSubgroups: {', '.join(ssoc_index.label(group) for group in subgroups)}")
+    print(f"\n{len(occupations)} occupation(s) under SSOC {ssoc_index.label(code)}:")
+    for occupation in occupations:
+        print(f"  {occupation}")
+    
+    rollup = ssoc_index.rollup(code, industry)
+    display_wage_data(rollup, f"Median of SSOC {ssoc_index.label(code)}", industry)
+
 def plot_wage_trends(data: pd.DataFrame, occupation: str, industry: str):
     """Plot wage trends over years."""
     if data.empty or len(data) < 2:
@@ -99,26 +117,108 @@ def plot_wage_trends(data: pd.DataFrame, occupation: str, industry: str):
     plt.tight_layout()
     plt.show()
 
-def select_occupation(occupations: list) -> str:
+class PrefixTrie:
+    """Character trie mapping lowercase keys to the ids stored under them.
+    
+    Keys are inserted in sorted order, so walking the children in insertion
+    order yields matches alphabetically without sorting at query time. Only
+    the first `depth` characters get nodes; longer prefixes are checked
+    against the few keys stored below that depth.
+    """
+    
+    def __init__(self, items, depth: int = 8):
+        self.depth = depth
+        self.root = ({}, [])
+        for key, value in sorted(items):
+            node = self.root
+            for char in key[:depth]:
+                node = node[0].setdefault(char, ({}, []))
+            node[1].append((key, value))
+    
+    def values(self, prefix: str):
+        """Yield the ids under every key starting with prefix, one at a time."""
+        node = self.root
+        for char in prefix[:self.depth]:
+            node = node[0].get(char)
+            if node is None:
+                return
+        stack = [node]
+        while stack:
+            children, entries = stack.pop()
+            for key, value in entries:
+                if len(prefix) <= self.depth or key.startswith(prefix):
+                    yield value
+            stack.extend(reversed(children.values()))
+
+class OccupationCompleter(Completer):
+    """Occupation completions from a title trie and a word trie.
+    
+    Titles starting with the typed text come first, then titles whose words
+    start with every typed word, in any order. If neither finds anything,
+    the closest spellings from the search index are offered. Completions
+    are yielded as they are found and show the SSOC code alongside.
+    """
+    
+    def __init__(self, search: OccupationSearch, ssoc_codes: dict):
+        self.search = search
+        self.ssoc_codes = ssoc_codes
+        self.titles = PrefixTrie((lowered, i) for i, lowered in enumerate(search.lowered))
+        self.words = PrefixTrie((word, word) for word in search.words)
+    
+    def word_matches(self, words: list):
+        """Ids of titles with a word starting with each of words, in title order."""
+        candidates = None
+        for word in sorted(words, key=len, reverse=True):
+            ids = set()
+            for match in self.words.values(word):
+                ids.update(self.search.word_titles[match])
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return []
+        return sorted(candidates)
+    
+    def completion(self, title: str, text: str) -> Completion:
+        return Completion(title, start_position=-len(text), display_meta=self.ssoc_codes.get(title, ''))
+    
+    def get_completions(self, document, complete_event):
+        text = document.text_before_cursor
+        query = text.lower().lstrip()
+        
+        seen = set()
+        for i in self.titles.values(query):
+            seen.add(i)
+            yield self.completion(self.search.titles[i], text)
+        
+        words = TOKEN_PATTERN.findall(query)
+        if not words:
+            return
+        for i in self.word_matches(words):
+            if i not in seen:
+                seen.add(i)
+                yield self.completion(self.search.titles[i], text)
+        
+        if not seen:
+            for title in self.search.fuzzy_search(query):
+                yield self.completion(title, text)
+
+def select_occupation(completer: OccupationCompleter) -> str:
     """Interactive occupation selection with fuzzy search."""
     print("\nSearch for an occupation (type to search):")
-    
-    # Create fuzzy completer
-    completer = FuzzyWordCompleter(occupations, match_middle=True)
+    search = completer.search
     
     while True:
         try:
-            selected = prompt('Occupation: ', completer=completer)
+            selected = prompt('Occupation: ', completer=completer, complete_in_thread=True)
+            
+            # Ranked partial matches, or close spellings if nothing contains the input
+            partial_matches = search.match(selected)
             
             # Find exact match (case-insensitive)
-            matches = [occ for occ in occupations if occ.lower() == selected.lower()]
+            matches = [occ for occ in partial_matches if occ.lower() == selected.lower()]
             
             if matches:
                 return matches[0]
             else:
-                # Find partial matches
-                partial_matches = [occ for occ in occupations if selected.lower() in occ.lower()]
-                
                 if len(partial_matches) == 0:
                     print(f"No occupation found matching '{selected}'. Please try again.")
                 elif len(partial_matches) == 1:
@@ -158,21 +258,47 @@ def select_industry(industries: list) -> str:
 
 def main():
     """Main CLI application."""
-    print("Loading wage data...")
+    parser = argparse.ArgumentParser(description="Singapore wage analysis tool")
+    parser.add_argument('--lazy', action='store_true',
+                        help="load each industry's sheets only when it is first selected")
+    parser.add_argument('--ssoc', metavar='CODE',
+                        help="show the occupations and median wages under an SSOC group (e.g. 2 or 25xx) and exit")
+    parser.add_argument('--industry', default='All Industries',
+                        help="industry for --ssoc (default: All Industries)")
+    args = parser.parse_args()
     
-    # Load all data
-    try:
-        df = load_all_wage_data()
-    except Exception as e:
-        print(f"Error loading data: {e}")
-        print("Please ensure the Excel files are in the current directory.")
-        sys.exit(1)
+    print("Loading wage data...")
     
-    if df.empty:
-        print("No data found. Please ensure Excel files are in the current directory.")
-        sys.exit(1)
+    if args.lazy:
+        # Industries are parsed on first use; occupations come from All Industries
+        df = LazyWageData()
+        index = None
+        if not df.workbooks:
+            print("No data found. Please ensure Excel files are in the current directory.")
+            sys.exit(1)
+        print(f"Found {len(df.workbooks)} workbooks covering {len(df.years)} years")
+    else:
+        # Load all data
+        try:
+            df = load_all_wage_data()
+        except Exception as e:
+            print(f"Error loading data: {e}")
+            print("Please ensure the Excel files are in the current directory.")
+            sys.exit(1)
+        
+        if df.empty:
+            print("No data found. Please ensure Excel files are in the current directory.")
+            sys.exit(1)
+        
+        print(f"Loaded {len(df)} records from {df['Year'].nunique()} years")
+        
+        # Build the lookup index once; every query afterwards is a dict access
+        index = WageIndex(df)
     
-    print(f"Loaded {len(df)} records from {df['Year'].nunique()} years")
+    if args.ssoc:
+        frame = df.load_industry(args.industry) if args.lazy else df
+        show_ssoc_group(SSOCIndex(frame), args.ssoc, args.industry)
+        return
     
     # Get unique occupations and industries
     occupations = get_unique_occupations(df)
@@ -180,6 +306,9 @@ def main():
     
     print(f"Found {len(occupations)} unique occupations across {len(industries)} industries")
     
+    # Build the occupation completer once for every search in the session
+    completer = OccupationCompleter(OccupationSearch(occupations), get_ssoc_codes(df))
+    
     # Main loop
     while True:
         print("\n" + "="*80)
@@ -187,7 +316,7 @@ def main():
         print("="*80)
         
         # Select occupation
-        occupation = select_occupation(occupations)
+        occupation = select_occupation(completer)
         if not occupation:
             break
         
@@ -197,7 +326,7 @@ def main():
             break
         
         # Filter and display data
-        filtered_data = filter_data(df, occupation, industry)
+        filtered_data = filter_data(df, occupation, industry, index=index)
         
         # Display table
         display_wage_data(filtered_data, occupation, industry)